@@ -0,0 +1,299 @@
+"""
+Streamlit以外のツール向けに、集計結果をJSONで返すローカルHTTP API
+
+    python api.py --port 8502
+
+エンドポイント:
+    /statistics          Statistics欄の集計値
+    /day-of-week         曜日別集計
+    /time-zone           時間帯別集計
+    /buy-in-breakdown    バイインの内訳
+    /history             トーナメント成績(新しい順、page / per_page でページング)
+
+フィルタはクエリパラメータで指定する。
+    since, until                 日付(YYYY-MM-DD)
+    buyin_min, buyin_max         Buy-in の範囲
+    players_min, players_max     Players の範囲
+    tournament_tags, buy_in_tags カンマ区切り
+    game_type                    Tournament GameType
+
+レスポンスには、プロセスごとのトークン・データセットのシグネチャ・バージョン・リクエストから作ったETagを付与する。
+If-None-Match が一致する場合は集計を行わず 304 を返す。
+バージョンはプロセス内の連番のため、トークンを含めて再起動後に古いETagが一致しないようにしている。
+/buy-in-breakdown は直近 HISTORY_DAY_MAX 日の成績が対象のため、対象期間の開始日もETagに含める。
+"""
+import argparse
+import collections
+import dataclasses
+import hashlib
+import json
+import math
+import threading
+import uuid
+
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app import (
+    Cols,
+    DAY_OF_WEEK_ORDER,
+    Filters,
+    HISTORY_DAY_MAX,
+    HISTORY_DISPLAY_MAX,
+    PARSED_COLUMNS,
+    SnapshotHolder,
+    apply_filters,
+    buy_in_breakdown_table,
+    directory_path,
+    finalize_statistics,
+    group_partials,
+    group_table,
+    hand_history_directory_path,
+    non_zero_buyin,
+    recent_history,
+    statistics_partials,
+)
+
+API_CACHE_MAX = 256
+HISTORY_PER_PAGE_DEFAULT = 50
+HISTORY_PER_PAGE_MAX = 500
+
+# 直近の成績を対象とし、結果が日付によって変わるエンドポイント
+HISTORY_SINCE_ROUTES = {'/buy-in-breakdown'}
+
+# /history で返す列
+HISTORY_COLUMNS = PARSED_COLUMNS + [
+    Cols.BUY_IN_CATEGORY,
+    Cols.PROFIT,
+    Cols.HANDS,
+    Cols.VPIP,
+    Cols.ALL_IN_COUNT
+    ]
+
+class ApiError(Exception):
+    """
+    リクエストの誤りをHTTPステータスと共に表す。
+    """
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def query_value(query: dict, name: str, default=None):
+    """
+    クエリパラメータの値を1つ返す関数
+    """
+    values = query.get(name)
+    return values[-1] if values else default
+
+def query_list(query: dict, name: str) -> tuple:
+    """
+    カンマ区切り(または複数指定)のクエリパラメータをタプルで返す関数
+    """
+    return tuple(value for values in query.get(name, []) for value in values.split(',') if value)
+
+def query_number(query: dict, name: str, default, converter=float):
+    """
+    数値のクエリパラメータを返す関数
+    """
+    value = query_value(query, name)
+    if value is None:
+        return default
+    try:
+        return converter(value)
+    except ValueError:
+        raise ApiError(400, f'Invalid number for {name}: {value}')
+
+def query_date(query: dict, name: str, default: date) -> date:
+    """
+    日付(YYYY-MM-DD)のクエリパラメータを返す関数
+    """
+    value = query_value(query, name)
+    if value is None:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(400, f'Invalid date for {name}: {value}')
+
+def parse_filters(df, query: dict) -> Filters:
+    """
+    クエリパラメータからフィルタ条件を作成する関数
+    指定が無い項目は、画面の初期値と同じく全件を対象とする。
+    """
+    return Filters(
+        since=query_date(query, 'since', df[Cols.START_TIME].min().date()),
+        until=query_date(query, 'until', df[Cols.START_TIME].max().date()),
+        buyin_range=(query_number(query, 'buyin_min', 0),
+                     query_number(query, 'buyin_max', math.ceil(df[Cols.BUY_IN].max()))),
+        players_range=(query_number(query, 'players_min', 0),
+                       query_number(query, 'players_max', df[Cols.PLAYERS].max())),
+        tournament_tags=query_list(query, 'tournament_tags'),
+        buy_in_tags=query_list(query, 'buy_in_tags'),
+        game_type=query_value(query, 'game_type', ''))
+
+def history_since() -> date:
+    """
+    直近の成績の対象とする開始日を返す関数
+    日付単位にすることで、同じ日の間はキャッシュとETagが有効となる。
+    """
+    return (datetime.now() - timedelta(days=HISTORY_DAY_MAX)).date()
+
+def table_records(table) -> list:
+    """
+    インデックス付きの集計表をJSON用のレコード一覧に変換する関数
+    """
+    return json.loads(table.reset_index().to_json(orient='records', date_format='iso', force_ascii=False))
+
+class StatsApi:
+    """
+    共有データセットのスナップショットから各エンドポイントのレスポンスを作成する。
+    レスポンスはデータセットのバージョンごとにキャッシュし、バージョンが変わったら破棄する。
+    """
+    def __init__(self, holder: SnapshotHolder):
+        self._holder = holder
+        self._lock = threading.Lock()
+        self._cache = collections.OrderedDict()
+        self._cache_version = None
+        # 再起動するとバージョンが1から振り直されるため、プロセスごとのトークンをETagに含める
+        self._process_token = uuid.uuid4().hex
+
+    def handle(self, path: str, query_string: str, if_none_match: str = None):
+        """
+        (ステータス, ETag, ボディ) を返す。
+        """
+        if path not in self._routes():
+            raise ApiError(404, f'Unknown endpoint: {path}')
+
+        snapshot = self._holder.get()
+        query = parse_qs(query_string)
+        since = history_since() if path in HISTORY_SINCE_ROUTES else None
+        key = (path, since, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        digest = hashlib.sha1(repr((self._process_token, snapshot.signature, snapshot.version, key)).encode('utf-8'))
+        etag = '"{}-{}"'.format(snapshot.version, digest.hexdigest()[:16])
+
+        if if_none_match and (if_none_match.strip() == '*'
+                              or etag in [tag.strip() for tag in if_none_match.split(',')]):
+            return 304, etag, b''
+
+        with self._lock:
+            if self._cache_version != snapshot.version:
+                self._cache.clear()
+                self._cache_version = snapshot.version
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                return 200, etag, body
+
+        payload = self._routes()[path](snapshot, query, since)
+        payload['version'] = snapshot.version
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+        with self._lock:
+            if self._cache_version == snapshot.version:
+                self._cache[key] = body
+                while len(self._cache) > API_CACHE_MAX:
+                    self._cache.popitem(last=False)
+        return 200, etag, body
+
+    def _routes(self) -> dict:
+        return {
+            '/statistics': self._statistics,
+            '/day-of-week': self._day_of_week,
+            '/time-zone': self._time_zone,
+            '/buy-in-breakdown': self._buy_in_breakdown,
+            '/history': self._history,
+            }
+
+    def _filtered(self, snapshot, query: dict):
+        if snapshot.df.empty:
+            return snapshot.df
+        return apply_filters(snapshot.df, parse_filters(snapshot.df, query))
+
+    def _statistics(self, snapshot, query: dict, since: date) -> dict:
+        filtered_df = self._filtered(snapshot, query)
+        stats = finalize_statistics(statistics_partials(filtered_df), snapshot.itm_ratio)
+        return {'statistics': dataclasses.asdict(stats)}
+
+    def _day_of_week(self, snapshot, query: dict, since: date) -> dict:
+        filtered_df = self._filtered(snapshot, query)
+        non_zero_buyin_df = non_zero_buyin(filtered_df)
+        partials = group_partials(filtered_df, non_zero_buyin_df, Cols.DAY_OF_WEEK)
+        return {'rows': table_records(group_table(partials, Cols.DAY_OF_WEEK, DAY_OF_WEEK_ORDER))}
+
+    def _time_zone(self, snapshot, query: dict, since: date) -> dict:
+        filtered_df = self._filtered(snapshot, query)
+        non_zero_buyin_df = non_zero_buyin(filtered_df)
+        partials = group_partials(filtered_df, non_zero_buyin_df, Cols.TIME_ZONE)
+        return {'rows': table_records(group_table(partials, Cols.TIME_ZONE))}
+
+    def _buy_in_breakdown(self, snapshot, query: dict, since: date) -> dict:
+        # 画面と同じく直近のトーナメント成績を対象とし、開始日はETagと同じ値を使う
+        history_df = recent_history(self._filtered(snapshot, query), HISTORY_DAY_MAX, HISTORY_DISPLAY_MAX, since)
+        table = buy_in_breakdown_table(history_df)
+        return {
+            'since': since.isoformat(),
+            'table': json.loads(table.to_json(orient='index', force_ascii=False)),
+            }
+
+    def _history(self, snapshot, query: dict, since: date) -> dict:
+        page = query_number(query, 'page', 1, int)
+        per_page = query_number(query, 'per_page', HISTORY_PER_PAGE_DEFAULT, int)
+        if page < 1 or not 1 <= per_page <= HISTORY_PER_PAGE_MAX:
+            raise ApiError(400, f'page must be >= 1 and per_page between 1 and {HISTORY_PER_PAGE_MAX}')
+
+        # スナップショットはStart Time順に並んでいるため、末尾から切り出せば新しい順になる
+        filtered_df = self._filtered(snapshot, query)
+        total = len(filtered_df)
+        end = total - (page - 1) * per_page
+        start = max(end - per_page, 0)
+        items = filtered_df.iloc[start:max(end, 0)].iloc[::-1]
+        items = items[[column for column in HISTORY_COLUMNS if column in items]]
+        return {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'items': json.loads(items.to_json(orient='records', date_format='iso', force_ascii=False)),
+            }
+
+def make_handler(api: StatsApi):
+    """
+    StatsApiを使うリクエストハンドラのクラスを返す関数
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                status, etag, body = api.handle(url.path, url.query, self.headers.get('If-None-Match'))
+            except ApiError as e:
+                status, etag, body = e.status, None, json.dumps({'error': str(e)}).encode('utf-8')
+            except Exception as e:
+                self.log_error('Unhandled error for %s: %r', self.path, e)
+                status, etag, body = 500, None, json.dumps({'error': 'Internal server error'}).encode('utf-8')
+
+            self.send_response(status)
+            if etag:
+                self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            if status != 304:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+
+    return Handler
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='ggprofit local stats API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args()
+
+    api = StatsApi(SnapshotHolder(directory_path, hand_history_directory_path))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api))
+    print(f'Serving ggprofit API on http://{args.host}:{args.port}')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 import os
+import numpy as np
 import pandas as pd
 import altair as alt
 import streamlit as st
 import re
 import dataclasses
 import math
+import io
+import gzip
+import threading
+import tempfile
 
 from currency_converter import CurrencyConverter
 from datetime import datetime, timedelta
@@ -28,10 +33,47 @@ RANK_PAR_GOOD = 'GOOD(10%~15%)'
 RANK_PAR_VERY_GOOD = 'VERY GOOD(5%~10%)'
 RANK_PAR_BEST = 'BEST(~5%)'
 
+# 曜日別・時間帯別集計に使う列
+NON_ZERO_BUYIN_COLUMNS = ['Day Of Week', 'Time Zone', 'Profit', 'Total Buy-in', 'Av ROI']
+
+# 曜日の順序
+DAY_OF_WEEK_ORDER = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
 # 過去履歴情報
 HISTORY_DISPLAY_MAX = 100
 HISTORY_DAY_MAX = 180
 
+# エクスポート設定
+EXPORT_FORMAT_CSV = 'CSV'
+EXPORT_FORMAT_CSV_GZIP = 'CSV (gzip)'
+EXPORT_FORMAT_PARQUET = 'Parquet'
+EXPORT_CHUNK_SIZE = 10000
+
+# ローリング集計
+ROLLING_TOURNAMENT_WINDOWS = [50, 100, 500]
+ROLLING_DAY_WINDOWS = [7, 30, 90]
+ROLLING_METRIC_ROI = 'ROI'
+ROLLING_METRIC_ITM = 'ITM%'
+ROLLING_METRIC_PROFIT = 'Profit'
+ROLLING_KIND_TOURNAMENTS = 'Tournaments'
+ROLLING_KIND_DAYS = 'Days'
+
+# 大規模データ向けのチャンク処理モード
+# 環境変数 GGPROFIT_OUT_OF_CORE=1 で有効にする
+OUT_OF_CORE_MODE = os.environ.get('GGPROFIT_OUT_OF_CORE', '') == '1'
+STORE_PATH = './store/tournaments.csv'
+STORE_CHUNK_SIZE = 100000
+# チャンク集計結果のキャッシュ(フィルタ条件ごと)の上限件数と保持秒数
+STORE_CACHE_MAX_ENTRIES = 32
+STORE_CACHE_TTL = 3600
+
+# ハンド履歴
+HAND_HISTORY_HEADER = 'Poker Hand #'
+HAND_HISTORY_TOURNAMENT_ID_PATTERN = re.compile(r'Tournament #(\d+)')
+HAND_HISTORY_HOLE_CARDS = '*** HOLE CARDS ***'
+HAND_HISTORY_VPIP_ACTIONS = (': calls ', ': raises ', ': bets ')
+HAND_HISTORY_ALL_IN = 'and is all-in'
+
 @dataclasses.dataclass(frozen=True)
 class Cols:
     """
@@ -57,6 +99,77 @@ class Cols:
     PROFIT: str = 'Profit'
     CUMULATIVE_PROFIT: str = 'Cumulative Profit'
     RECORD_INDEX: str = 'Record Index'
+    "以下、ハンド履歴からの集計カラム"
+    HANDS: str = 'Hands'
+    VPIP_HANDS: str = 'VPIP Hands'
+    VPIP: str = 'VPIP'
+    ALL_IN_COUNT: str = 'All-in Count'
+
+# ハンド履歴から集計する列(VPIP(%)を除く)
+HAND_COUNT_COLUMNS = [
+    Cols.TOURNAMENT_ID,
+    Cols.HANDS,
+    Cols.VPIP_HANDS,
+    Cols.ALL_IN_COUNT
+    ]
+
+# サマリーファイルから解析する列
+PARSED_COLUMNS = [
+    Cols.TOURNAMENT_ID,
+    Cols.TOURNAMENT_NAME,
+    Cols.TOURNAMENT_GAME_TYPE,
+    Cols.BUY_IN,
+    Cols.TOTAL_BUY_IN,
+    Cols.PRIZE,
+    Cols.START_TIME,
+    Cols.PLAYERS,
+    Cols.TOTAL_PRIZE_POOL,
+    Cols.RANK,
+    Cols.ENTRY_COUNT,
+    Cols.RANK_PARCENT
+    ]
+
+@dataclasses.dataclass(frozen=True)
+class Filters:
+    """
+    画面上のフィルタ条件を保持する。
+    """
+    since: object
+    until: object
+    buyin_range: tuple
+    players_range: tuple
+    tournament_tags: tuple = ()
+    buy_in_tags: tuple = ()
+    game_type: str = ''
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """
+    全セッションで共有する、前処理済みデータセットのスナップショット。
+    df は読み取り専用として扱い、各セッションは絞り込み結果のみを独自に保持する。
+    """
+    version: int
+    signature: tuple
+    df: pd.DataFrame
+    tournament_ids: frozenset
+    itm_ratio: float
+
+@dataclasses.dataclass(frozen=True)
+class Statistics:
+    """
+    Statistics欄に表示する集計値を保持する。
+    """
+    total_tournaments: int
+    total_prize: float
+    total_entries: int
+    average_profit: float
+    average_buy_in: float
+    itm_ratio: float
+    average_roi: float
+    total_profit: float
+    total_hands: int
+    vpip: float
+    all_in_count: int
 
 def get_eur_usd_rate() -> float:
     """
@@ -226,6 +339,227 @@ def parse_file(filepath=None, lines=None):
     return tournament_id, tournament_name, tournament_game_type, buy_in, total_buy_in, \
             prize, start_time, reentry_count, players, total_prize, rank, rank_parcent
 
+class FileCache:
+    """
+    (パス, 更新時刻, サイズ) をキーに、ファイル単位の解析結果を保持する。
+    commit() の時点までに参照されなかったファイル(削除・更新されたファイル)の結果は破棄する。
+    """
+    def __init__(self):
+        self._entries = {}
+        self._used = {}
+
+    def get(self, filepath: str, func):
+        """
+        キャッシュ済みの結果を返す。ファイルが変更されていれば func で解析し直す。
+        """
+        stat = os.stat(filepath)
+        key = (filepath, stat.st_mtime_ns, stat.st_size)
+        result = self._entries[key] if key in self._entries else func(filepath)
+        self._used[key] = result
+        return result
+
+    def commit(self) -> None:
+        """
+        今回参照された結果のみを残す。
+        """
+        self._entries = self._used
+        self._used = {}
+
+def iter_hands(filepath: str):
+    """
+    ハンド履歴ファイルを1ハンドずつ読み込むジェネレータ
+    ファイル全体は読み込まず、1ハンド分の行リストのみを保持する。
+    """
+    # BOM付きでエクスポートされたファイルでも先頭のハンドを読み飛ばさないよう utf-8-sig で開く
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        hand = []
+        for line in f:
+            if line.startswith(HAND_HISTORY_HEADER):
+                if hand:
+                    yield hand
+                hand = [line]
+            elif hand:
+                hand.append(line)
+        if hand:
+            yield hand
+
+def parse_hand(lines: list):
+    """
+    1ハンド分の行からトーナメントID、VPIP有無、オールイン有無を取り出す関数
+    ヒーローは「Dealt to」行でカードが表示されているプレイヤーとする。
+    """
+    match = HAND_HISTORY_TOURNAMENT_ID_PATTERN.search(lines[0])
+    if not match:
+        return None, False, False
+    tournament_id = match.group(1)
+
+    hero = None
+    preflop = False
+    vpip = False
+    all_in = False
+    for line in lines[1:]:
+        if line.startswith('***'):
+            if line.startswith(HAND_HISTORY_HOLE_CARDS):
+                preflop = True
+                continue
+            preflop = False
+            if line.startswith('*** SUMMARY'):
+                break
+            continue
+        if hero is None:
+            if line.startswith('Dealt to ') and '[' in line:
+                hero = line[len('Dealt to '):line.index(' [')]
+            continue
+        if not line.startswith(hero + ': '):
+            continue
+        if preflop and line.startswith(HAND_HISTORY_VPIP_ACTIONS, len(hero)):
+            vpip = True
+        if HAND_HISTORY_ALL_IN in line:
+            all_in = True
+
+    return tournament_id, vpip, all_in
+
+def iter_hand_history_files(hand_history_directory_path: str):
+    """
+    ハンド履歴フォルダ内のtxtファイルのパスを1つずつ返すジェネレータ
+    フォルダが無い場合は何も返さない。
+    """
+    try:
+        with os.scandir(hand_history_directory_path) as entries:
+            for entry in entries:
+                if entry.name.endswith('.txt'):
+                    yield os.path.join(hand_history_directory_path, entry.name)
+    except FileNotFoundError:
+        return
+
+def list_hand_history_files(hand_history_directory_path: str) -> list:
+    """
+    ハンド履歴フォルダ内のtxtファイルの一覧を返す関数
+    フォルダが無い場合は空のリストを返す。
+    """
+    return list(iter_hand_history_files(hand_history_directory_path))
+
+def aggregate_hand_history_file(filepath: str) -> dict:
+    """
+    ハンド履歴ファイル1つをトーナメントID単位で集計する関数
+    戻り値はトーナメントIDをキー、[ハンド数, VPIPハンド数, オールイン回数] を値とする辞書
+    """
+    aggregates = {}
+    try:
+        for hand in iter_hands(filepath):
+            tournament_id, vpip, all_in = parse_hand(hand)
+            if tournament_id is None:
+                continue
+            counts = aggregates.setdefault(tournament_id, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += vpip
+            counts[2] += all_in
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Could not parse hand history in {filepath}: {e}")
+    return aggregates
+
+def aggregate_hand_histories(filepaths, file_cache: FileCache = None) -> pd.DataFrame:
+    """
+    ハンド履歴ファイル群をトーナメントID単位で集計する関数
+    集計値: ハンド数、VPIPハンド数、VPIP(%)、オールイン回数
+    file_cache を渡すと、変更されていないファイルは読み直さない。
+    """
+    aggregates = {}
+    for filepath in filepaths:
+        if file_cache is not None:
+            file_aggregates = file_cache.get(filepath, aggregate_hand_history_file)
+        else:
+            file_aggregates = aggregate_hand_history_file(filepath)
+        for tournament_id, file_counts in file_aggregates.items():
+            counts = aggregates.setdefault(tournament_id, [0, 0, 0])
+            for i, count in enumerate(file_counts):
+                counts[i] += count
+
+    hand_df = pd.DataFrame(
+        [[tournament_id] + counts for tournament_id, counts in aggregates.items()],
+        columns=HAND_COUNT_COLUMNS)
+    return add_vpip(hand_df)
+
+def add_vpip(hand_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    ハンド数とVPIPハンド数からVPIP(%)を追加する関数
+    """
+    hand_df[Cols.VPIP] = round(hand_df[Cols.VPIP_HANDS] / hand_df[Cols.HANDS] * 100, 2)
+    return hand_df
+
+def merge_hand_histories(df: pd.DataFrame, hand_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    トーナメント成績にハンド履歴の集計を結合する関数
+    ハンド履歴が無いトーナメントはハンド数0、VPIPは空欄とする。
+    """
+    df = df.drop(columns=[Cols.HANDS, Cols.VPIP_HANDS, Cols.VPIP, Cols.ALL_IN_COUNT], errors='ignore')
+    df = pd.merge(df, hand_df, on=Cols.TOURNAMENT_ID, how='left')
+    df[Cols.HANDS] = df[Cols.HANDS].fillna(0).astype(int)
+    df[Cols.VPIP_HANDS] = df[Cols.VPIP_HANDS].fillna(0).astype(int)
+    df[Cols.ALL_IN_COUNT] = df[Cols.ALL_IN_COUNT].fillna(0).astype(int)
+    return df
+
+def rolling_column(metric: str, window: str) -> str:
+    """
+    ローリング集計の列名を返す関数
+    window はトーナメント数なら '100'、日数なら '30d' の形式
+    """
+    return f'Rolling {metric} ({window})'
+
+def rolling_window_labels(kind: str) -> list:
+    """
+    ローリング集計の種類ごとのウィンドウ表記一覧を返す関数
+    """
+    if kind == ROLLING_KIND_DAYS:
+        return [f'{days}d' for days in ROLLING_DAY_WINDOWS]
+    return [str(window) for window in ROLLING_TOURNAMENT_WINDOWS]
+
+def add_rolling_metrics(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    """
+    直近Nトーナメント、直近N日のROI・ITM%・収支を追加する関数
+    Start Time順に並んだdfに対して累積和を1回だけ計算し、
+    各ウィンドウの値は累積和の差分で求める。
+    データ数がウィンドウに満たない間は、それまでの全件で集計する。
+    ITM%はStatistics欄と同じく、イン・ザ・マネー回数をエントリー数で割って求める。
+    呼び出し元が df を所有している場合は copy=False とし、コピーせずに列を追加する。
+    """
+    if copy:
+        df = df.copy()
+    n = len(df)
+    profit = df[Cols.PROFIT].to_numpy(dtype=float)
+    buy_in = df[Cols.TOTAL_BUY_IN].to_numpy(dtype=float)
+    itm = (df[Cols.PRIZE].to_numpy(dtype=float) > 0).astype(float)
+    entries = df[Cols.ENTRY_COUNT].to_numpy(dtype=float)
+
+    # 先頭に0を付けた累積和
+    profit_sum = np.concatenate(([0.0], np.cumsum(profit)))
+    buy_in_sum = np.concatenate(([0.0], np.cumsum(buy_in)))
+    itm_sum = np.concatenate(([0.0], np.cumsum(itm)))
+    entry_sum = np.concatenate(([0.0], np.cumsum(entries)))
+    right = np.arange(1, n + 1)
+
+    def assign(window: str, left: np.ndarray) -> None:
+        window_profit = profit_sum[right] - profit_sum[left]
+        window_buy_in = buy_in_sum[right] - buy_in_sum[left]
+        window_entries = entry_sum[right] - entry_sum[left]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df[rolling_column(ROLLING_METRIC_ROI, window)] = np.where(
+                window_buy_in > 0, window_profit / window_buy_in * 100, np.nan)
+            df[rolling_column(ROLLING_METRIC_ITM, window)] = np.where(
+                window_entries > 0, (itm_sum[right] - itm_sum[left]) / window_entries * 100, np.nan)
+        df[rolling_column(ROLLING_METRIC_PROFIT, window)] = window_profit
+
+    for window in ROLLING_TOURNAMENT_WINDOWS:
+        assign(str(window), np.maximum(right - window, 0))
+
+    start_times = df[Cols.START_TIME].to_numpy(dtype='datetime64[ns]')
+    for days in ROLLING_DAY_WINDOWS:
+        # Start Timeはソート済みなので、ウィンドウ開始位置は二分探索で一括して求める
+        left = np.searchsorted(start_times, start_times - np.timedelta64(days, 'D'), side='right')
+        assign(f'{days}d', left)
+
+    return df
+
 def categorize_buyin(buyin: float) -> str:
     """
     バイインをカテゴリに振り分ける関数
@@ -265,126 +599,187 @@ def categorize_rank_parcent(rank_parcent: float) -> str:
     else:
         return RANK_PAR_FAIR
 
-def show_in_the_money_distribution(df: pd.DataFrame) -> None:
+def in_the_money_counts(df: pd.DataFrame) -> pd.Series:
+    """
+    イン・ザ・マネー分配カテゴリ別の件数を返す関数
+    チャンク単位で算出した値は足し合わせることができる。
+    """
+    categories = df[Cols.RANK_PARCENT_CATEGORY]
+    categories = categories[categories != '']
+    return categories.groupby(categories).size()
+
+def show_in_the_money_distribution(counts: pd.Series) -> None:
     """
     イン・ザ・マネー分配の棒グラフを表示する関数
     """
     # イン・ザ・マネー分配カテゴリの順序を定義
     rank_par_category_order = [RANK_PAR_FAIR, RANK_PAR_GOOD, RANK_PAR_VERY_GOOD, RANK_PAR_BEST]
 
-    # イン・ザ・マネー分配
-    IMT_df = df.copy()
-    IMT_df = IMT_df[IMT_df[Cols.RANK_PARCENT_CATEGORY] != '']
-
-    # イン・ザ・マネー分配カテゴリ列をCategorical型に変換してカスタム順序を指定
-    IMT_df[Cols.RANK_PARCENT_CATEGORY] \
-        = pd.Categorical(IMT_df[Cols.RANK_PARCENT_CATEGORY],
-                        categories=rank_par_category_order, ordered=True)
+    # イン・ザ・マネー分配カテゴリ列をカスタム順序で並び替え
+    counts = counts.reindex(rank_par_category_order, fill_value=0)
+    counts.index.name = Cols.RANK_PARCENT_CATEGORY
 
-    # イン・ザ・マネー分配カテゴリ列でデータフレームを並び替え
-    IMT_df.sort_values(by=Cols.BUY_IN_CATEGORY, inplace=True)
-
-    df_target = IMT_df.groupby(Cols.RANK_PARCENT_CATEGORY).count() / len(IMT_df) * 100
+    df_target = counts / counts.sum() * 100 if counts.sum() > 0 else counts
 
     st.subheader('イン・ザ・マネー分配')
-    st.bar_chart(df_target['Tournament ID'])
+    st.bar_chart(df_target.rename(Cols.TOURNAMENT_ID))
 
-def show_day_of_week(df: pd.DataFrame, non_zero_buyin_df: pd.DataFrame) -> None:
+def non_zero_buyin(df: pd.DataFrame) -> pd.DataFrame:
     """
-    曜日別集計を表示する関数
+    バイインが0でないトーナメントについて、曜日別・時間帯別集計に必要な列のみを抽出する関数
+    全列をコピーしないよう、先に列を絞り込む。
     """
-    # 曜日別のROIを計算
-    daywise_roi = round((non_zero_buyin_df.groupby(Cols.DAY_OF_WEEK)[Cols.PROFIT].sum() / non_zero_buyin_df.groupby(Cols.DAY_OF_WEEK)[Cols.TOTAL_BUY_IN].sum()) * 100, 2)
-    daywise_roi = daywise_roi.reset_index()
-    daywise_roi = daywise_roi.rename(columns={0: 'ROI'})
-
-    # 曜日別のAv ROIを計算
-    daywise_av_roi = round(non_zero_buyin_df.groupby(Cols.DAY_OF_WEEK)['Av ROI'].mean(), 2)
-    daywise_av_roi = daywise_av_roi.reset_index()
-    daywise_av_roi = daywise_av_roi.rename(columns={0: 'Av ROI'})
-
-    # 曜日の順序を定義
-    day_order = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-
-    # 曜日別の参加数
-    day_count = df.groupby(Cols.DAY_OF_WEEK).size().reset_index(name='Total Tournaments')
-
-    # 曜日列をCategorical型に変換してカスタム順序を指定
-    day_count[Cols.DAY_OF_WEEK] = pd.Categorical(day_count[Cols.DAY_OF_WEEK], categories=day_order, ordered=True)
+    return df.loc[df[Cols.BUY_IN] != 0, NON_ZERO_BUYIN_COLUMNS]
 
-    # 曜日列でデータフレームを並び替え
-    day_count.sort_values(by=Cols.DAY_OF_WEEK, inplace=True)
-
-    # データフレームをマージ
-    day_of_week_df_ = pd.merge(day_count, daywise_roi, on=Cols.DAY_OF_WEEK)
-    day_of_week_df = pd.merge(day_of_week_df_, daywise_av_roi, on=Cols.DAY_OF_WEEK)
-
-    # インデックスを変更
-    day_of_week_df.set_index(Cols.DAY_OF_WEEK, inplace=True)
+def group_partials(df: pd.DataFrame, non_zero_buyin_df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    曜日別・時間帯別集計のための部分集計を返す関数
+    件数と合計値のみを持つため、チャンク単位で算出した値は足し合わせることができる。
+    """
+    non_zero_group = non_zero_buyin_df.groupby(key)
+    partials = pd.DataFrame({
+        'Total Tournaments': df.groupby(key).size(),
+        Cols.PROFIT: non_zero_group[Cols.PROFIT].sum(),
+        Cols.TOTAL_BUY_IN: non_zero_group[Cols.TOTAL_BUY_IN].sum(),
+        'Av ROI Sum': non_zero_group['Av ROI'].sum(),
+        'Av ROI Count': non_zero_group['Av ROI'].count(),
+        'Non Zero Buy-in Count': non_zero_group.size(),
+    })
+    return partials.fillna(0)
+
+def group_table(partials: pd.DataFrame, key: str, order: list = None) -> pd.DataFrame:
+    """
+    部分集計から参加数・ROI・Av ROIの表を作成する関数
+    バイインが0でないトーナメントが無いグループは除外する。
+    """
+    partials = partials[partials['Non Zero Buy-in Count'] > 0]
+    table = pd.DataFrame({
+        'Total Tournaments': partials['Total Tournaments'].astype(int),
+        'ROI': round(partials[Cols.PROFIT] / partials[Cols.TOTAL_BUY_IN] * 100, 2),
+        'Av ROI': round(partials['Av ROI Sum'] / partials['Av ROI Count'], 2),
+    })
+    if order is not None:
+        table = table.reindex([value for value in order if value in table.index])
+    else:
+        table = table.sort_index()
+    table.index.name = key
+    return table
 
+def show_day_of_week(partials: pd.DataFrame) -> None:
+    """
+    曜日別集計を表示する関数
+    """
     # 曜日別集計
     st.subheader('曜日別集計')
-    st.dataframe(day_of_week_df)
+    st.dataframe(group_table(partials, Cols.DAY_OF_WEEK, DAY_OF_WEEK_ORDER))
 
-def show_time_zone(df: pd.DataFrame, non_zero_buyin_df: pd.DataFrame) -> None:
+def show_time_zone(partials: pd.DataFrame) -> None:
     """
     時間帯別集計を表示する関数
     """
-    # 時間帯別のROIを計算
-    timewise_roi = round((non_zero_buyin_df.groupby(Cols.TIME_ZONE)[Cols.PROFIT].sum() / non_zero_buyin_df.groupby(Cols.TIME_ZONE)[Cols.TOTAL_BUY_IN].sum()) * 100, 2)
-    timewise_roi = timewise_roi.reset_index()
-    timewise_roi = timewise_roi.rename(columns={0: 'ROI'})
-
-    # 時間帯別のAv ROIを計算
-    timewise_av_roi = round(non_zero_buyin_df.groupby(Cols.TIME_ZONE)['Av ROI'].mean(), 2)
-    timewise_av_roi = timewise_av_roi.reset_index()
-    timewise_av_roi = timewise_av_roi.rename(columns={0: 'Av ROI'})
-
-    # 時間帯別の参加数
-    time_zone_count = df.groupby(Cols.TIME_ZONE).size().reset_index(name='Total Tournaments')
-
-    # データフレームをマージ
-    time_zone_df_ = pd.merge(time_zone_count, timewise_roi, on=Cols.TIME_ZONE)
-    time_zone_df = pd.merge(time_zone_df_, timewise_av_roi, on=Cols.TIME_ZONE)
-
-    # インデックスを変更
-    time_zone_df.set_index(Cols.TIME_ZONE, inplace=True)
-
     # 時間帯別集計
     st.subheader('時間帯別集計')
-    st.dataframe(time_zone_df)
+    st.dataframe(group_table(partials, Cols.TIME_ZONE))
 
-def show_tournament_history(df: pd.DataFrame, day_max: int, display_max: int) -> pd.DataFrame:
+def recent_history(df: pd.DataFrame, day_max: int, display_max: int, since=None) -> pd.DataFrame:
     """
-    直近のトーナメント成績を表示する関数
+    直近day_max日間のトーナメント成績を新しい順に抽出する関数
+    since を渡した場合は、現在時刻ではなくその日時以降を対象とする。
     """
-    # Tournament History
     # 現在の日付からday_max日前の日付を計算
-    dt_6months_ago = datetime.now() - timedelta(days=day_max)
+    dt_6months_ago = pd.Timestamp(since) if since is not None else datetime.now() - timedelta(days=day_max)
     # 直近のトーナメント成績をフィルタリング
     history_df = df[df[Cols.START_TIME] >= dt_6months_ago]
     # トーナメント開始時間の降順ソート
-    history_df.sort_values(Cols.START_TIME, ascending=False, inplace=True)
+    # 同時刻のトーナメントはトーナメントIDの降順とし、読み込み順に関わらず同じ並びにする
+    history_df = history_df.sort_values([Cols.START_TIME, Cols.TOURNAMENT_ID], ascending=False, kind='stable')
 
     # 表示件数オーバしている場合
     if len(history_df) > display_max:
         # 表示件数を抽出
-        history_df = history_df.iloc[0:display_max -1, :]
+        history_df = history_df.iloc[0:display_max, :]
 
     # インデックスを変更
-    history_df.set_index(Cols.TOURNAMENT_ID, inplace=True)
+    return history_df.set_index(Cols.TOURNAMENT_ID)
+
+def show_tournament_history(df: pd.DataFrame, day_max: int, display_max: int) -> pd.DataFrame:
+    """
+    直近のトーナメント成績を表示する関数
+    """
+    # Tournament History
+    history_df = recent_history(df, day_max, display_max)
 
     st.subheader('Tournament History')
     st.dataframe(history_df)
 
-    # Export df
-    history_df.to_csv('history.csv')
-
     return history_df
 
-def show_buy_in_breakdown(df: pd.DataFrame) -> None:
+def iter_csv_chunks(df: pd.DataFrame, chunk_size: int = EXPORT_CHUNK_SIZE):
     """
-    バイインの内訳を表示する関数
+    DataFrameをchunk_size行ずつCSV文字列に変換して返すジェネレータ
+    ヘッダは最初のチャンクにのみ付与する。
+    """
+    if df.empty:
+        yield df.to_csv()
+        return
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size].to_csv(header=(start == 0))
+
+def build_export(df: pd.DataFrame, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    DataFrameをチャンク単位でエクスポート用のバイト列に変換する関数
+    ディスクには書き込まず、メモリ上のバッファにのみ書き出す。
+    戻り値は (データ, 拡張子, MIMEタイプ)
+    """
+    buffer = io.BytesIO()
+
+    if export_format == EXPORT_FORMAT_PARQUET:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        for start in range(0, max(len(df), 1), chunk_size):
+            table = pa.Table.from_pandas(df.iloc[start:start + chunk_size],
+                                         schema=writer.schema if writer else None)
+            if writer is None:
+                writer = pq.ParquetWriter(buffer, table.schema)
+            writer.write_table(table)
+        writer.close()
+        return buffer.getvalue(), 'parquet', 'application/octet-stream'
+
+    if export_format == EXPORT_FORMAT_CSV_GZIP:
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as gz:
+            for chunk in iter_csv_chunks(df, chunk_size):
+                gz.write(chunk.encode('utf-8'))
+        return buffer.getvalue(), 'csv.gz', 'application/gzip'
+
+    for chunk in iter_csv_chunks(df, chunk_size):
+        buffer.write(chunk.encode('utf-8'))
+    return buffer.getvalue(), 'csv', 'text/csv'
+
+def show_export(df: pd.DataFrame, name: str) -> None:
+    """
+    エクスポートボタンを表示する関数
+    ボタンが押された時のみファイルを生成し、ダウンロードボタンを表示する。
+    """
+    col_format, col_button = st.columns(2)
+    export_format = col_format.selectbox('Export Format',
+        [EXPORT_FORMAT_CSV, EXPORT_FORMAT_CSV_GZIP, EXPORT_FORMAT_PARQUET],
+        key=f'export_format_{name}')
+
+    if col_button.button(f'Export {name}', key=f'export_{name}'):
+        try:
+            data, extension, mime = build_export(df, export_format)
+        except ImportError:
+            st.warning('Parquet export requires pyarrow. Please install it with `pip install pyarrow`.')
+            return
+        st.download_button(f'Download {name}.{extension}', data=data,
+                           file_name=f'{name}.{extension}', mime=mime,
+                           key=f'download_{name}')
+
+def buy_in_breakdown_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    バイインカテゴリ別のイン・ザ・マネー率と合計賞金の表を作成する関数
     """
     # グループ化してトーナメント数をカウント
     buyin_tournament_count_df = df.groupby(Cols.BUY_IN_CATEGORY).size().reset_index(name='Tournaments Count')
@@ -435,6 +830,14 @@ def show_buy_in_breakdown(df: pd.DataFrame) -> None:
     df_tm.loc['イン ザ マネー %'] = list_1
     df_tm.loc['合計賞金'] = list_2
 
+    return df_tm
+
+def show_buy_in_breakdown(df: pd.DataFrame) -> None:
+    """
+    バイインの内訳を表示する関数
+    """
+    df_tm = buy_in_breakdown_table(df)
+
     # バイインの内訳
     st.subheader('バイインの内訳')
     st.write(BUY_IN_FREEROLL_DSP + BUY_IN_FREEROLL_RANGE.replace('$', '\$').replace('~', '\~') + ' '
@@ -444,164 +847,111 @@ def show_buy_in_breakdown(df: pd.DataFrame) -> None:
         + BUY_IN_HIGH_DSP + BUY_IN_HIGH_RANGE.replace('$', '\$').replace('~', '\~'))
     st.dataframe(df_tm)
 
-# Initialize DataFrame with dtype
-# Tournament Name column added for demonstration. Please populate it correctly.
-df = pd.DataFrame(columns=[
-    Cols.TOURNAMENT_ID,
-    Cols.TOURNAMENT_NAME,
-    Cols.TOURNAMENT_GAME_TYPE,
-    Cols.BUY_IN,
-    Cols.TOTAL_BUY_IN,
-    Cols.PRIZE,
-    Cols.START_TIME,
-    Cols.PLAYERS,
-    Cols.TOTAL_PRIZE_POOL,
-    Cols.RANK,
-    Cols.ENTRY_COUNT,
-    Cols.RANK_PARCENT
-    ], dtype=object)
+def parsed_row(parsed: tuple) -> dict:
+    """
+    parse_fileの戻り値を、列名をキーとする辞書に変換する関数
+    """
+    tournament_id, tournament_name, tournament_game_type, buy_in, total_buy_in, \
+    prize, start_time, entry_count, players, total_prize, rank, rank_parcent = parsed
+    return {
+        Cols.TOURNAMENT_ID: tournament_id,
+        Cols.TOURNAMENT_NAME: tournament_name,
+        Cols.TOURNAMENT_GAME_TYPE: tournament_game_type,
+        Cols.BUY_IN: buy_in,
+        Cols.TOTAL_BUY_IN: total_buy_in,
+        Cols.PRIZE: prize,
+        Cols.START_TIME: start_time,
+        Cols.PLAYERS: players,
+        Cols.TOTAL_PRIZE_POOL: total_prize,
+        Cols.RANK: rank,
+        Cols.ENTRY_COUNT: entry_count,
+        Cols.RANK_PARCENT: rank_parcent
+        }
+
+def iter_parsed_rows(directory_path: str, file_cache: FileCache = None):
+    """
+    フォルダ内のサマリーファイルを1ファイルずつ解析し、1行分の辞書を返すジェネレータ
+    file_cache を渡すと、変更されていないファイルは解析し直さない。
+    """
+    # ファイル名の一覧を作らず、1件ずつ読み進める
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt'):
+                filepath = os.path.join(directory_path, entry.name)
+                if file_cache is not None:
+                    yield parsed_row(file_cache.get(filepath, parse_file))
+                else:
+                    yield parsed_row(parse_file(filepath))
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    解析済みの列から算出カラムを追加する関数
+    行ごとに完結する列のみを扱うため、チャンク単位でも適用できる。
+    """
+    # Convert columns to the correct dtype
+    df[Cols.BUY_IN] = df[Cols.BUY_IN].astype(float)
+    df[Cols.TOTAL_BUY_IN] = df[Cols.TOTAL_BUY_IN].astype(float)
+    df[Cols.PRIZE] = df[Cols.PRIZE].astype(float)
+    df[Cols.START_TIME] = pd.to_datetime(df[Cols.START_TIME])
 
-# Directory where the text files are stored (please adjust this path accordingly)
-directory_path = './tournaments/'
+    # バイインカテゴリ列を追加
+    df[Cols.BUY_IN_CATEGORY] = df[Cols.BUY_IN].apply(categorize_buyin)
 
-try:
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.txt'):
-            filepath = os.path.join(directory_path, filename)
-            tournament_id, tournament_name, tournament_game_type, buy_in, total_buy_in, \
-            prize, start_time, entry_count, players, total_prize, rank, rank_parcent = parse_file(filepath)
-            new_row = pd.DataFrame({
-                Cols.TOURNAMENT_ID: [tournament_id],
-                Cols.TOURNAMENT_NAME: [tournament_name],
-                Cols.TOURNAMENT_GAME_TYPE: [tournament_game_type],
-                Cols.BUY_IN: [buy_in],
-                Cols.TOTAL_BUY_IN: [total_buy_in],
-                Cols.PRIZE: [prize],
-                Cols.START_TIME: [start_time],
-                Cols.PLAYERS: [players],
-                Cols.TOTAL_PRIZE_POOL: [total_prize],
-                Cols.RANK: [rank],
-                Cols.ENTRY_COUNT: [entry_count],
-                Cols.RANK_PARCENT: [rank_parcent]
-                },  dtype=object)
-            df = pd.concat([df, new_row], ignore_index=True)
-
-except Exception as e:
-    print(f"An error occurred while reading files from {directory_path}: {e}")
-
-# Convert columns to the correct dtype
-df[Cols.BUY_IN] = df[Cols.BUY_IN].astype(float)
-df[Cols.TOTAL_BUY_IN] = df[Cols.TOTAL_BUY_IN].astype(float)
-df[Cols.PRIZE] = df[Cols.PRIZE].astype(float)
-
-# Calculate 'In The Money' ratio
-itm_count = len(df[df[Cols.PRIZE] > 0])
-total_entries = df[Cols.ENTRY_COUNT].sum()
-itm_ratio = (itm_count / total_entries) * 100 if total_entries > 0 else 0
-
-# Sort df by Start Time
-df[Cols.START_TIME] = pd.to_datetime(df[Cols.START_TIME])
-df.sort_values(Cols.START_TIME, inplace=True)
-
-# バイインカテゴリ列を追加
-df[Cols.BUY_IN_CATEGORY] = df[Cols.BUY_IN].apply(categorize_buyin)
-
-# 曜日列を追加
-df[Cols.DAY_OF_WEEK] = df[Cols.START_TIME].dt.strftime('%a')
-
-# 時間帯列を追加
-df[Cols.TIME_ZONE] = df[Cols.START_TIME].dt.strftime('%H')
-
-# 順位カテゴリ列を追加
-df[Cols.RANK_PARCENT_CATEGORY] = df[Cols.RANK_PARCENT].apply(categorize_rank_parcent)
-
-# Calculate Profit and Cumulative Profit
-df[Cols.PROFIT] = df[Cols.PRIZE] - df[Cols.TOTAL_BUY_IN]
-df[Cols.CUMULATIVE_PROFIT] = df[Cols.PROFIT].cumsum()
-
-# ROI
-df['Av ROI'] = df[Cols.PROFIT] / df[Cols.TOTAL_BUY_IN] * 100
-
-# Add record index for plotting
-df[Cols.RECORD_INDEX] = df.reset_index().index
-
-# Export df
-df.to_csv('out.csv')
-
-# Streamlit display
-st.title('Poker Tournament Profit Tracker')
-
-# File uploader
-uploaded_files = st.file_uploader('Choose txt files', type=['txt'], accept_multiple_files=True)
-
-if uploaded_files:
-    for uploaded_file in uploaded_files:
-        # File content can be read here and parsed accordingly
-        content = uploaded_file.read().decode()
-        lines = content.splitlines()
-
-        # File parsing (ここで先ほどのparse_file関数を使います)
-        tournament_id, tournament_name, tournament_game_type, buy_in, total_buy_in,
-        prize, start_time, entry_count, players, total_prize, rank, rank_parcent = parse_file(lines=lines)
-
-        # Append data to existing dataframe
-        new_row = pd.DataFrame({
-            Cols.TOURNAMENT_ID: [tournament_id],
-            Cols.TOURNAMENT_NAME: [tournament_name],
-            Cols.TOURNAMENT_GAME_TYPE: [tournament_game_type],
-            Cols.BUY_IN: [buy_in],
-            Cols.TOTAL_BUY_IN: [total_buy_in],
-            Cols.PRIZE: [prize],
-            Cols.START_TIME: [start_time],
-            Cols.PLAYERS: [players],
-            Cols.TOTAL_PRIZE_POOL: [total_prize],
-            Cols.RANK: [rank],
-            Cols.ENTRY_COUNT: [entry_count],
-            Cols.RANK_PARCENT: [rank_parcent]
-        }, dtype=object)
-        df = pd.concat([df, new_row], ignore_index=True)
+    # 曜日列を追加
+    df[Cols.DAY_OF_WEEK] = df[Cols.START_TIME].dt.strftime('%a')
 
-    # Sort df by Start Time
-    df[Cols.START_TIME] = pd.to_datetime(df[Cols.START_TIME])
-    df.sort_values(Cols.START_TIME, inplace=True)
+    # 時間帯列を追加
+    df[Cols.TIME_ZONE] = df[Cols.START_TIME].dt.strftime('%H')
 
-    # Calculate Profit and Cumulative Profit
+    # 順位カテゴリ列を追加
+    df[Cols.RANK_PARCENT_CATEGORY] = df[Cols.RANK_PARCENT].astype(float).apply(categorize_rank_parcent)
+
+    # Calculate Profit
     df[Cols.PROFIT] = df[Cols.PRIZE] - df[Cols.TOTAL_BUY_IN]
-    df[Cols.CUMULATIVE_PROFIT] = df[Cols.PROFIT].cumsum()
 
     # ROI
     df['Av ROI'] = df[Cols.PROFIT] / df[Cols.TOTAL_BUY_IN] * 100
 
-    # Add record index for plotting
-    df[Cols.RECORD_INDEX] = df.reset_index().index
+    return df
+
+def prepare_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    全件をメモリ上で扱う場合の前処理を行う関数
+    Start Time順に並べ、累積収支・レコード番号・ローリング集計を追加する。
+    """
+    df = add_derived_columns(df)
+
+    # Sort df by Start Time
+    df.sort_values(Cols.START_TIME, inplace=True)
+
+    # Calculate Cumulative Profit
+    df[Cols.CUMULATIVE_PROFIT] = df[Cols.PROFIT].cumsum()
 
-    # Export df
-    df.to_csv('out.csv')
+    # Add record index for plotting
+    df[Cols.RECORD_INDEX] = np.arange(len(df))
 
-# Arrange Date and Buy-in filters in a row
-col_01, col_02, col_03 = st.columns(3)
-col_11, col_12 = st.columns(2)
-col_31, col_32, col_33 = st.columns(3)
+    # ローリング集計列を追加
+    return add_rolling_metrics(df, copy=False)
 
-if df.empty:
-    st.warning('No data to display.')
-    st.image('howtouse.png', caption='How to use this app')
-else:
+def show_filters(min_date, max_date, max_buyin: float, max_players: int, game_type_list: list):
+    """
+    フィルタ入力欄を表示し、選択されたフィルタ条件とX軸を返す関数
+    """
+    # Arrange Date and Buy-in filters in a row
+    col_01, col_02, col_03 = st.columns(3)
+    col_11, col_12 = st.columns(2)
+    col_31, col_32, col_33 = st.columns(3)
 
     # Date range filter
-    default_since = df[Cols.START_TIME].min().date()
-    default_until = df[Cols.START_TIME].max().date()
-    since = col_01.date_input('Since', min_value=df[Cols.START_TIME].min().date(), max_value=df[Cols.START_TIME].max().date(), value=default_since)
-    until = col_02.date_input('Until', min_value=df[Cols.START_TIME].min().date(), max_value=df[Cols.START_TIME].max().date(), value=default_until)
+    since = col_01.date_input('Since', min_value=min_date, max_value=max_date, value=min_date)
+    until = col_02.date_input('Until', min_value=min_date, max_value=max_date, value=max_date)
 
     # Buy-in slider filter
     min_buyin = 0
-    max_buyin = df[Cols.BUY_IN].max()
     selected_buyin_range = col_11.slider('Buy-in Range', int(min_buyin), int(math.ceil(max_buyin)), (int(min_buyin), int(math.ceil(max_buyin))))
 
     # Players slider filter
     min_players = 0
-    max_players = df[Cols.PLAYERS].max()
     selected_players_range = col_03.slider('Players Range', int(min_players), int(max_players), (int(min_players), int(max_players)))
 
     # Tournament tag filter
@@ -647,93 +997,646 @@ else:
         Buy_IN_TAGS, default=[])
 
     # Select Game Type
-    game_type_list= df.drop_duplicates(subset=Cols.TOURNAMENT_GAME_TYPE)[Cols.TOURNAMENT_GAME_TYPE].to_list()
-    game_type_list.insert(0, '')
-    selected_game_type = col_33.selectbox('Tournament GameType', options=game_type_list)
-
-    # Apply filters
-    filtered_df = df[(df[Cols.START_TIME].dt.date >= since) & (df[Cols.START_TIME].dt.date <= until)]
-    filtered_df = filtered_df[(filtered_df[Cols.BUY_IN] >= selected_buyin_range[0]) & (filtered_df[Cols.BUY_IN] <= selected_buyin_range[1])]
-    filtered_df = filtered_df[(filtered_df[Cols.PLAYERS] >= selected_players_range[0]) & (filtered_df[Cols.PLAYERS] <= selected_players_range[1])]
-    filtered_df = filtered_df[filtered_df[Cols.TOURNAMENT_NAME].str.contains('|'.join(selected_tournament_tags))]
-    filtered_df = filtered_df[filtered_df[Cols.BUY_IN_CATEGORY].str.contains('|'.join(selected_buy_in_tags))]
-    if selected_game_type != '':
-        filtered_df = filtered_df[filtered_df[Cols.TOURNAMENT_GAME_TYPE] == selected_game_type]
-
-    # Recalculate Cumulative Profit
-    filtered_df.sort_values(Cols.START_TIME, inplace=True)
-    filtered_df[Cols.CUMULATIVE_PROFIT] = filtered_df[Cols.PROFIT].cumsum()
+    selected_game_type = col_33.selectbox('Tournament GameType', options=[''] + list(game_type_list))
 
     # Choose X-axis
     x_axis_choice = col_32.selectbox('Choose X-axis', ['Start Time', 'Record Index'])
 
-    # Reset index if Record Index is the chosen x-axis
-    if x_axis_choice == 'Record Index':
-        filtered_df[Cols.RECORD_INDEX] = filtered_df.reset_index().index
+    filters = Filters(
+        since=since,
+        until=until,
+        buyin_range=tuple(selected_buyin_range),
+        players_range=tuple(selected_players_range),
+        tournament_tags=tuple(selected_tournament_tags),
+        buy_in_tags=tuple(selected_buy_in_tags),
+        game_type=selected_game_type)
+    return filters, x_axis_choice
+
+def apply_filters(df: pd.DataFrame, filters: Filters) -> pd.DataFrame:
+    """
+    フィルタ条件に一致する行を抽出する関数
+    全行が一致する場合はコピーせず、元のDataFrameをそのまま返す。
+    タグは正規表現ではなく文字列として部分一致で比較する。
+    作成するのは真偽値のマスクのみで、行ごとの日付オブジェクトは作らない。
+    """
+    start_time = df[Cols.START_TIME]
+    # Until は当日を含むため、翌日0時より前を対象とする
+    mask = (start_time >= pd.Timestamp(filters.since)) & (start_time < pd.Timestamp(filters.until) + pd.Timedelta(days=1))
+    mask &= (df[Cols.BUY_IN] >= filters.buyin_range[0]) & (df[Cols.BUY_IN] <= filters.buyin_range[1])
+    mask &= (df[Cols.PLAYERS] >= filters.players_range[0]) & (df[Cols.PLAYERS] <= filters.players_range[1])
+    if filters.tournament_tags:
+        mask &= df[Cols.TOURNAMENT_NAME].str.contains('|'.join(map(re.escape, filters.tournament_tags)), na=False)
+    if filters.buy_in_tags:
+        mask &= df[Cols.BUY_IN_CATEGORY].str.contains('|'.join(map(re.escape, filters.buy_in_tags)), na=False)
+    if filters.game_type != '':
+        mask &= df[Cols.TOURNAMENT_GAME_TYPE] == filters.game_type
+    if mask.all():
+        return df
+    return df[mask]
+
+def statistics_partials(df: pd.DataFrame) -> dict:
+    """
+    Statistics欄のための部分集計を返す関数
+    件数と合計値のみを持つため、チャンク単位で算出した値は足し合わせることができる。
+    """
+    # バイインが0でない場合のみのAv ROI
+    non_zero_av_roi = df['Av ROI'][df[Cols.BUY_IN] != 0]
+    return {
+        'count': len(df),
+        'prize': df[Cols.PRIZE].sum(),
+        'entries': df[Cols.ENTRY_COUNT].sum(),
+        'itm': int((df[Cols.PRIZE] > 0).sum()),
+        'profit': df[Cols.PROFIT].sum(),
+        'buy_in': df[Cols.BUY_IN].sum(),
+        'roi_sum': non_zero_av_roi.sum(),
+        'roi_count': non_zero_av_roi.count(),
+        'hands': df[Cols.HANDS].sum() if Cols.HANDS in df else 0,
+        'vpip_hands': df[Cols.VPIP_HANDS].sum() if Cols.VPIP_HANDS in df else 0,
+        'all_in': df[Cols.ALL_IN_COUNT].sum() if Cols.ALL_IN_COUNT in df else 0,
+        }
+
+def merge_statistics_partials(total: dict, partials: dict) -> dict:
+    """
+    Statistics欄の部分集計を足し合わせる関数
+    """
+    return {key: total.get(key, 0) + value for key, value in partials.items()}
+
+def in_the_money_ratio(partials: dict) -> float:
+    """
+    部分集計からイン・ザ・マネー率を求める関数
+    """
+    return (partials['itm'] / partials['entries']) * 100 if partials['entries'] > 0 else 0
+
+def finalize_statistics(partials: dict, itm_ratio: float) -> Statistics:
+    """
+    部分集計からStatistics欄の集計値を求める関数
+    """
+    count = partials['count']
+    hands = int(partials['hands'])
+    return Statistics(
+        total_tournaments=int(count),
+        total_prize=float(partials['prize']),
+        total_entries=int(partials['entries']),
+        average_profit=float(partials['profit'] / count) if count > 0 else 0.0,
+        average_buy_in=float(partials['buy_in'] / count) if count > 0 else 0.0,
+        itm_ratio=float(itm_ratio),
+        # ROIが計算可能な場合のみ平均を計算
+        average_roi=float(partials['roi_sum'] / partials['roi_count']) if partials['roi_count'] > 0 else 0.0,
+        total_profit=float(partials['profit']),
+        total_hands=hands,
+        vpip=float(partials['vpip_hands'] / hands * 100) if hands > 0 else 0.0,
+        all_in_count=int(partials['all_in']))
+
+def show_statistics(stats: Statistics) -> None:
+    """
+    Statistics欄を表示する関数
+    """
+    st.write('### Statistics')
+    st.write(f"Total Tournaments: {stats.total_tournaments}")
+    st.write(f"Total Prize: \${stats.total_prize:.2f}（{stats.total_prize * get_usd_jpy_rate():,.0f}円）")
+    st.write(f"Total Entries: {stats.total_entries}")
+    st.write(f"Average Profit: \${stats.average_profit:.2f}（{stats.average_profit * get_usd_jpy_rate():,.0f}円）")
+    st.write(f"Average Buy-in: \${stats.average_buy_in:.2f}（{stats.average_buy_in * get_usd_jpy_rate():,.0f}円）")
+    st.write(f"In The Money (%): {stats.itm_ratio:.2f}%")
+    st.write(f"Average ROI: {stats.average_roi:.2f}%")
+    st.write(f"Total Profit: \${stats.total_profit:.2f}（{stats.total_profit * get_usd_jpy_rate():,.0f}円）")
+    if stats.total_hands > 0:
+        st.write(f"Total Hands: {stats.total_hands}")
+        st.write(f"VPIP: {stats.vpip:.2f}%")
+        st.write(f"All-in Count: {stats.all_in_count}")
+    st.write(f"※exchange rate €1 = \${get_eur_usd_rate()}  1元 =  \${get_cny_usd_rate()} $1 = {get_usd_jpy_rate()}円")
+
+def add_partials(total, partials):
+    """
+    グループ別の部分集計(DataFrame/Series)を足し合わせる関数
+    """
+    return partials if total is None else total.add(partials, fill_value=0)
+
+def profit_buckets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    累積収支グラフを間引いて描画するための、日別の収支合計と件数を返す関数
+    """
+    group = df.groupby(df[Cols.START_TIME].dt.floor('D'))
+    return pd.DataFrame({
+        Cols.PROFIT: group[Cols.PROFIT].sum(),
+        'Count': group.size(),
+    })
+
+def cumulative_profit_points(buckets: pd.DataFrame) -> pd.DataFrame:
+    """
+    日別の部分集計から、各日の終わり時点の累積収支とレコード番号を求める関数
+    """
+    buckets = buckets.sort_index()
+    return pd.DataFrame({
+        Cols.START_TIME: buckets.index,
+        Cols.CUMULATIVE_PROFIT: buckets[Cols.PROFIT].cumsum().to_numpy(),
+        Cols.RECORD_INDEX: (buckets['Count'].cumsum() - 1).to_numpy(),
+    })
+
+def show_cumulative_profit_chart(chart_df: pd.DataFrame, x_axis_choice: str) -> None:
+    """
+    累積収支の折れ線グラフを表示する関数
+    """
+    tooltip = [
+        alt.Tooltip(f'{column}:{data_type}', title=column)
+        for column, data_type in [
+            (Cols.TOURNAMENT_ID, 'N'),
+            (Cols.TOURNAMENT_NAME, 'N'),
+            (Cols.START_TIME, 'T'),
+            (Cols.CUMULATIVE_PROFIT, 'Q')]
+        if column in chart_df]
+
+    chart = alt.Chart(chart_df, width=600, height=400).mark_line().encode(
+        x=alt.X(f'{x_axis_choice}:Q' if x_axis_choice == 'Record Index' else f'{x_axis_choice}:T', title=x_axis_choice),
+        y=alt.Y('Cumulative Profit:Q', title='Cumulative Profit'),
+        tooltip=tooltip
+    ).properties(
+        width=600,
+        height=400
+    ).interactive()
+
+    st.write(chart)
+
+def iter_row_chunks(rows, columns: list, chunk_size: int):
+    """
+    1行分のデータを chunk_size 行ずつのDataFrameにまとめて返すジェネレータ
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame(chunk, columns=columns)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=columns)
+
+def iter_hand_history_rows(hand_history_directory_path: str):
+    """
+    ハンド履歴ファイルを1ファイルずつ集計し、[トーナメントID, ハンド数, VPIPハンド数, オールイン回数] を返すジェネレータ
+    複数のファイルにまたがるトーナメントは複数行になる。
+    """
+    for filepath in iter_hand_history_files(hand_history_directory_path):
+        for tournament_id, counts in aggregate_hand_history_file(filepath).items():
+            yield [tournament_id] + counts
+
+def write_chunks(chunks, path: str) -> int:
+    """
+    DataFrameのチャンクを1つのCSVに追記し、書き出した行数を返す関数
+    """
+    count = 0
+    for chunk in chunks:
+        chunk.to_csv(path, mode='a', header=count == 0, index=False)
+        count += len(chunk)
+    return count
+
+def partition_chunks(path: str, partition_paths: list, chunk_size: int) -> None:
+    """
+    CSVをchunk_size行ずつ読み込み、トーナメントIDのハッシュでパーティションごとのCSVに振り分ける関数
+    同じトーナメントIDは必ず同じパーティションに入る。
+    """
+    if not os.path.exists(path):
+        return
+    # 値を変換せずにそのまま書き戻すため、全て文字列として読み込む
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        partition = pd.util.hash_pandas_object(chunk[Cols.TOURNAMENT_ID], index=False) % len(partition_paths)
+        for number, partition_df in chunk.groupby(partition.to_numpy()):
+            partition_path = partition_paths[number]
+            partition_df.to_csv(partition_path, mode='a', header=not os.path.exists(partition_path), index=False)
+
+def read_hand_partition(path: str) -> pd.DataFrame:
+    """
+    パーティション内のハンド履歴の集計を読み込み、トーナメントID単位に合算する関数
+    """
+    if not os.path.exists(path):
+        return add_vpip(pd.DataFrame(columns=HAND_COUNT_COLUMNS).astype({column: int for column in HAND_COUNT_COLUMNS[1:]}))
+    hand_df = pd.read_csv(path, dtype={Cols.TOURNAMENT_ID: str})
+    return add_vpip(hand_df.groupby(Cols.TOURNAMENT_ID, as_index=False).sum())
+
+def build_store(directory_path: str, hand_history_directory_path: str, store_path: str = STORE_PATH,
+                chunk_size: int = STORE_CHUNK_SIZE) -> None:
+    """
+    サマリーファイルを解析し、ハンド履歴の集計を結合してストア(CSV)に書き出す関数
+    サマリーとハンド履歴の集計はそれぞれ一時ファイルに書き出し、トーナメントIDでパーティションに分けてから
+    パーティション単位で結合する。パーティション数は1パーティションがおよそchunk_size件になるように決めるため、
+    メモリ上に置くのは常にchunk_size件程度のデータのみとなる。
+    書き出し中は一時ファイルに書き込み、完了後に置き換える。
+    """
+    store_directory = os.path.dirname(store_path)
+    os.makedirs(store_directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=store_directory) as work_directory:
+        summary_path = os.path.join(work_directory, 'summaries.csv')
+        hand_path = os.path.join(work_directory, 'hands.csv')
+        summary_count = write_chunks(iter_row_chunks(iter_parsed_rows(directory_path), PARSED_COLUMNS, chunk_size),
+                                     summary_path)
+        hand_count = write_chunks(iter_row_chunks(iter_hand_history_rows(hand_history_directory_path),
+                                                  HAND_COUNT_COLUMNS, chunk_size), hand_path)
+
+        partitions = max(1, math.ceil(max(summary_count, hand_count) / chunk_size))
+        summary_partition_paths = [os.path.join(work_directory, f'summaries_{i}.csv') for i in range(partitions)]
+        hand_partition_paths = [os.path.join(work_directory, f'hands_{i}.csv') for i in range(partitions)]
+        partition_chunks(summary_path, summary_partition_paths, chunk_size)
+        partition_chunks(hand_path, hand_partition_paths, chunk_size)
+
+        temp_path = store_path + '.tmp'
+        header = True
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            for summary_partition_path, hand_partition_path in zip(summary_partition_paths, hand_partition_paths):
+                if not os.path.exists(summary_partition_path):
+                    continue
+                hand_df = read_hand_partition(hand_partition_path)
+                for chunk in pd.read_csv(summary_partition_path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+                    merge_hand_histories(chunk, hand_df).to_csv(f, header=header, index=False)
+                    header = False
+            if header:
+                chunk = pd.DataFrame(columns=PARSED_COLUMNS)
+                merge_hand_histories(chunk, read_hand_partition(hand_partition_paths[0])).to_csv(f, index=False)
+        os.replace(temp_path, store_path)
+
+def iter_store_chunks(store_path: str, chunk_size: int = STORE_CHUNK_SIZE):
+    """
+    ストアをchunk_size行ずつ読み込み、算出カラムを追加して返すジェネレータ
+    """
+    dtype = {
+        Cols.TOURNAMENT_ID: str,
+        Cols.TOURNAMENT_NAME: str,
+        Cols.TOURNAMENT_GAME_TYPE: str,
+        Cols.RANK: str
+        }
+    for chunk in pd.read_csv(store_path, chunksize=chunk_size, dtype=dtype):
+        chunk[Cols.TOURNAMENT_NAME] = chunk[Cols.TOURNAMENT_NAME].fillna('Unknown')
+        chunk[Cols.TOURNAMENT_GAME_TYPE] = chunk[Cols.TOURNAMENT_GAME_TYPE].fillna('Unknown')
+        yield add_derived_columns(chunk)
+
+@st.cache_data(show_spinner=False, max_entries=STORE_CACHE_MAX_ENTRIES, ttl=STORE_CACHE_TTL)
+def scan_store(store_path: str, store_mtime: float, chunk_size: int = STORE_CHUNK_SIZE) -> dict:
+    """
+    ストアをチャンク単位で走査し、フィルタの選択肢と全体の部分集計を求める関数
+    store_mtime はストア更新時にキャッシュを無効化するために受け取る。
+    """
+    min_time = None
+    max_time = None
+    max_buyin = 0.0
+    max_players = 0
+    game_types = {}
+    partials = {}
+    for chunk in iter_store_chunks(store_path, chunk_size):
+        chunk_min = chunk[Cols.START_TIME].min()
+        chunk_max = chunk[Cols.START_TIME].max()
+        if pd.isna(chunk_min):
+            continue
+        min_time = chunk_min if min_time is None else min(min_time, chunk_min)
+        max_time = chunk_max if max_time is None else max(max_time, chunk_max)
+        max_buyin = max(max_buyin, chunk[Cols.BUY_IN].max())
+        max_players = max(max_players, chunk[Cols.PLAYERS].max())
+        game_types.update(dict.fromkeys(chunk[Cols.TOURNAMENT_GAME_TYPE].drop_duplicates()))
+        partials = merge_statistics_partials(partials, statistics_partials(chunk))
+
+    return {
+        'min_time': min_time,
+        'max_time': max_time,
+        'max_buyin': max_buyin,
+        'max_players': max_players,
+        'game_types': list(game_types),
+        'statistics': partials,
+        }
+
+@st.cache_data(show_spinner=False, max_entries=STORE_CACHE_MAX_ENTRIES, ttl=STORE_CACHE_TTL)
+def analyze_store(store_path: str, store_mtime: float, filters: Filters, history_since, display_max: int,
+                  chunk_size: int = STORE_CHUNK_SIZE) -> dict:
+    """
+    ストアをチャンク単位で読み込み、フィルタ後の集計値を部分集計の合算で求める関数
+    保持するのは部分集計(日別の収支を含む)と直近display_max件の成績のみのため、メモリ使用量はトーナメント数に比例しない。
+    history_since は直近の成績の候補とする開始日で、日付単位で渡すことで同じ日の間はキャッシュが効く。
+    """
+    statistics = {}
+    in_the_money = None
+    day_of_week = None
+    time_zone = None
+    buckets = None
+    history_df = None
+    history_since = pd.Timestamp(history_since)
+
+    for chunk in iter_store_chunks(store_path, chunk_size):
+        filtered_df = apply_filters(chunk, filters)
+        if filtered_df.empty:
+            continue
+        non_zero_buyin_df = non_zero_buyin(filtered_df)
+
+        statistics = merge_statistics_partials(statistics, statistics_partials(filtered_df))
+        in_the_money = add_partials(in_the_money, in_the_money_counts(filtered_df))
+        day_of_week = add_partials(day_of_week, group_partials(filtered_df, non_zero_buyin_df, Cols.DAY_OF_WEEK))
+        time_zone = add_partials(time_zone, group_partials(filtered_df, non_zero_buyin_df, Cols.TIME_ZONE))
+        buckets = add_partials(buckets, profit_buckets(filtered_df))
+
+        # 直近の成績は上位display_max件のみ保持する
+        recent_df = filtered_df[filtered_df[Cols.START_TIME] >= history_since]
+        history_df = recent_df if history_df is None else pd.concat([history_df, recent_df])
+        # 同時刻のトーナメントは全て残し、最終的な件数の絞り込みは recent_history に任せる
+        history_df = history_df.nlargest(display_max, Cols.START_TIME, keep='all')
+
+    return {
+        'statistics': statistics,
+        'in_the_money': in_the_money,
+        'day_of_week': day_of_week,
+        'time_zone': time_zone,
+        'buckets': buckets,
+        'history': history_df,
+        }
+
+def show_out_of_core(directory_path: str, hand_history_directory_path: str, store_path: str = STORE_PATH) -> None:
+    """
+    チャンク処理モードの画面を表示する関数
+    全件をDataFrameに読み込まず、ストアをチャンク単位で集計して表示する。
+    """
+    if not os.path.exists(store_path) or st.button('Rebuild Store'):
+        with st.spinner('Building store...'):
+            build_store(directory_path, hand_history_directory_path, store_path)
+
+    store_mtime = os.path.getmtime(store_path)
+    bounds = scan_store(store_path, store_mtime)
+
+    if bounds['min_time'] is None:
+        st.warning('No data to display.')
+        st.image('howtouse.png', caption='How to use this app')
+        return
+
+    filters, x_axis_choice = show_filters(bounds['min_time'].date(), bounds['max_time'].date(),
+                                          bounds['max_buyin'], bounds['max_players'], bounds['game_types'])
+    history_since = (datetime.now() - timedelta(days=HISTORY_DAY_MAX)).date()
+    result = analyze_store(store_path, store_mtime, filters, history_since, HISTORY_DISPLAY_MAX)
+
+    # If no rows match the filters, display a message
+    if not result['statistics']:
+        st.warning('No data to display.')
+        st.image('howtouse.png', caption='How to use this app')
+        return
+
+    show_cumulative_profit_chart(cumulative_profit_points(result['buckets']), x_axis_choice)
+
+    show_statistics(finalize_statistics(result['statistics'], in_the_money_ratio(bounds['statistics'])))
+
+    # イン・ザ・マネー分配
+    show_in_the_money_distribution(result['in_the_money'])
+
+    # 曜日別
+    show_day_of_week(result['day_of_week'])
+
+    # 時間帯別
+    show_time_zone(result['time_zone'])
+
+    # Tournament History
+    history_df = show_tournament_history(result['history'], HISTORY_DAY_MAX, HISTORY_DISPLAY_MAX)
+    show_export(history_df, 'history')
+
+    # バイインの内訳
+    show_buy_in_breakdown(history_df)
+
+def directory_signature(*directory_paths) -> tuple:
+    """
+    フォルダの更新時刻の組を返す関数
+    ファイルの追加・削除でフォルダの更新時刻が変わるため、新しいトーナメントの検知に使う。
+    """
+    signature = []
+    for directory_path in directory_paths:
+        try:
+            signature.append(os.stat(directory_path).st_mtime_ns)
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+class SnapshotHolder:
+    """
+    全セッションで共有するデータセットのスナップショットを保持する。
+    フォルダに新しいトーナメントが追加された場合は、新しいバージョンのスナップショットを作成して差し替える。
+    アップロードされたトーナメントは共有のスナップショットには加えず、アップロードしたセッションのみで使う。
+    """
+    def __init__(self, directory_path: str, hand_history_directory_path: str):
+        self._directory_path = directory_path
+        self._hand_history_directory_path = hand_history_directory_path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._hand_df = None
+        self._summary_cache = FileCache()
+        self._hand_cache = FileCache()
+
+    def get(self) -> Snapshot:
+        """
+        最新のスナップショットを返す。フォルダが更新されていれば作り直す。
+        """
+        signature = directory_signature(self._directory_path, self._hand_history_directory_path)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.signature != signature:
+                self._rebuild(signature)
+            return self._snapshot
+
+    def with_uploads(self, rows: list) -> Snapshot:
+        """
+        アップロードされたトーナメントのうち、未登録のものを加えたスナップショットを返す。
+        戻り値は呼び出したセッション専用で、共有のスナップショットは変更しない。
+        ファイルは読み直さず、現在のスナップショットに行を追加して前処理のみやり直す。
+        """
+        snapshot = self.get()
+        new_rows = []
+        known_ids = set(snapshot.tournament_ids)
+        for row in rows:
+            if row[Cols.TOURNAMENT_ID] not in known_ids:
+                known_ids.add(row[Cols.TOURNAMENT_ID])
+                new_rows.append(row)
+        if not new_rows:
+            return snapshot
+
+        with self._lock:
+            hand_df = self._hand_df
+        df = pd.concat([snapshot.df[PARSED_COLUMNS],
+                        pd.DataFrame(new_rows, columns=PARSED_COLUMNS, dtype=object)], ignore_index=True)
+        return make_snapshot(snapshot.version, snapshot.signature, prepare_dataset(merge_hand_histories(df, hand_df)))
+
+    def _rebuild(self, signature: tuple) -> None:
+        # 変更されていないファイルはキャッシュ済みの解析結果を使う
+        try:
+            rows = list(iter_parsed_rows(self._directory_path, self._summary_cache))
+        except Exception as e:
+            print(f"An error occurred while reading files from {self._directory_path}: {e}")
+            rows = []
+        self._summary_cache.commit()
+
+        hand_history_files = list_hand_history_files(self._hand_history_directory_path)
+        self._hand_df = aggregate_hand_histories(hand_history_files, self._hand_cache)
+        self._hand_cache.commit()
+
+        df = pd.DataFrame(rows, columns=PARSED_COLUMNS, dtype=object)
+        df = df.drop_duplicates(subset=Cols.TOURNAMENT_ID, ignore_index=True)
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        # 参照の差し替えのみで公開するため、読み込み中のセッションは古いスナップショットを使い続けられる
+        self._snapshot = make_snapshot(version, signature, prepare_dataset(merge_hand_histories(df, self._hand_df)))
+
+def make_snapshot(version: int, signature: tuple, df: pd.DataFrame) -> Snapshot:
+    """
+    前処理済みのdfからスナップショットを作成する関数
+    """
+    return Snapshot(
+        version=version,
+        signature=signature,
+        df=df,
+        tournament_ids=frozenset(df[Cols.TOURNAMENT_ID]),
+        itm_ratio=in_the_money_ratio(statistics_partials(df)))
+
+@st.cache_resource
+def get_snapshot_holder(directory_path: str, hand_history_directory_path: str) -> SnapshotHolder:
+    """
+    プロセス内で1つだけのSnapshotHolderを返す関数
+    """
+    return SnapshotHolder(directory_path, hand_history_directory_path)
+
+def show_footer() -> None:
+    """
+    画面の下部にTwitterリンクを表示する関数
+    """
+    st.markdown(
+        """
+        ---
+
+        Follow me on X: [kacchimu](https://twitter.com/kacchimu)
+        """,
+        unsafe_allow_html=True,
+    )
+
+# Directory where the text files are stored (please adjust this path accordingly)
+directory_path = './tournaments/'
+
+# Directory where the hand history files are stored
+hand_history_directory_path = './hand_histories/'
+
+def main() -> None:
+    """
+    Streamlitの画面を表示する関数
+    """
+    # Streamlit display
+    st.title('Poker Tournament Profit Tracker')
+
+    if OUT_OF_CORE_MODE:
+        show_out_of_core(directory_path, hand_history_directory_path)
+        show_footer()
+        return
+
+    # 全セッションで共有するデータセット
+    snapshot_holder = get_snapshot_holder(directory_path, hand_history_directory_path)
+    snapshot = snapshot_holder.get()
+
+    # File uploader
+    uploaded_files = st.file_uploader(
+        'Choose txt files', type=['txt'], accept_multiple_files=True,
+        help='アップロードしたトーナメントはこのセッションのみで集計され、他のセッションには表示されません。')
+
+    uploaded_count = 0
+    if uploaded_files:
+        upload_rows = []
+        for uploaded_file in uploaded_files:
+            # File content can be read here and parsed accordingly
+            content = uploaded_file.getvalue().decode()
+            lines = content.splitlines()
+            upload_rows.append(parsed_row(parse_file(lines=lines)))
+
+        # 未登録のトーナメントを加えたスナップショットはこのセッションのみで保持し、
+        # アップロード内容か共有データセットのバージョンが変わった場合のみ作り直す
+        upload_key = (snapshot.version, repr(upload_rows))
+        upload_snapshot = st.session_state.get('upload_snapshot')
+        if upload_snapshot is None or upload_snapshot[0] != upload_key:
+            upload_snapshot = (upload_key, snapshot_holder.with_uploads(upload_rows))
+            st.session_state['upload_snapshot'] = upload_snapshot
+        uploaded_count = len(upload_snapshot[1].tournament_ids) - len(snapshot.tournament_ids)
+        snapshot = upload_snapshot[1]
+    else:
+        st.session_state.pop('upload_snapshot', None)
+
+    df = snapshot.df
+    itm_ratio = snapshot.itm_ratio
+    if uploaded_count:
+        st.caption(f'Dataset version {snapshot.version} (+{uploaded_count} uploaded in this session)')
+    else:
+        st.caption(f'Dataset version {snapshot.version}')
 
-    # If filtered_df is empty, display a message
-    if filtered_df.empty:
+    if df.empty:
         st.warning('No data to display.')
         st.image('howtouse.png', caption='How to use this app')
     else:
-        # Generate the chart with the filtered data
-        chart = alt.Chart(filtered_df, width=600, height=400).mark_line().encode(
-            x=alt.X(f'{x_axis_choice}:Q' if x_axis_choice == 'Record Index' else f'{x_axis_choice}:T', title=x_axis_choice),
-            y=alt.Y('Cumulative Profit:Q', title='Cumulative Profit'),
-            tooltip=[
-                alt.Tooltip('Tournament ID:N', title='Tournament ID'),
-                alt.Tooltip('Tournament Name:N', title='Tournament Name'),
-                alt.Tooltip('Start Time:T', title='Start Time'),
-                alt.Tooltip('Cumulative Profit:Q', title='Cumulative Profit')]
-        ).properties(
-            width=600,
-            height=400
-        ).interactive()
-
-        st.write(chart)
-
-        # バイインが0でない場合のみでフィルタリング
-        non_zero_buyin_df = filtered_df[filtered_df[Cols.BUY_IN] != 0]
+        game_type_list = df[Cols.TOURNAMENT_GAME_TYPE].drop_duplicates().to_list()
+        filters, x_axis_choice = show_filters(df[Cols.START_TIME].min().date(), df[Cols.START_TIME].max().date(),
+                                              df[Cols.BUY_IN].max(), df[Cols.PLAYERS].max(), game_type_list)
 
-        # ROIが計算可能な場合のみ平均を計算
-        if not non_zero_buyin_df.empty:
-            avg_roi = ((non_zero_buyin_df[Cols.PROFIT] / non_zero_buyin_df[Cols.TOTAL_BUY_IN]) * 100).mean()
+        # Apply filters
+        filtered_df = apply_filters(df, filters)
+
+        # フィルタで件数が変わった場合のみ、絞り込み結果に対して再計算する
+        # 絞り込み結果はこのセッションが所有するコピーのため、そのまま列を書き換える(共有データセットは変更しない)
+        # 共有データセットはStart Time順に並んでおり、絞り込み後も順序は保たれる
+        if len(filtered_df) != len(df):
+            # Recalculate Cumulative Profit
+            filtered_df[Cols.CUMULATIVE_PROFIT] = filtered_df[Cols.PROFIT].cumsum()
+
+            # Reset record index for plotting
+            filtered_df[Cols.RECORD_INDEX] = np.arange(len(filtered_df))
+
+            filtered_df = add_rolling_metrics(filtered_df, copy=False)
+
+        # If filtered_df is empty, display a message
+        if filtered_df.empty:
+            st.warning('No data to display.')
+            st.image('howtouse.png', caption='How to use this app')
         else:
-            avg_roi = 0  # または 'N/A', 何も計算できない場合
+            # Generate the chart with the filtered data
+            show_cumulative_profit_chart(filtered_df, x_axis_choice)
 
-        # Additional stats below the graph
-        st.write('### Statistics')
-        st.write(f"Total Tournaments: {len(filtered_df)}")
-        st.write(f"Total Prize: \${filtered_df[Cols.PRIZE].sum():.2f}（{filtered_df[Cols.PRIZE].sum() * get_usd_jpy_rate():,.0f}円）")
-        st.write(f"Total Entries: {filtered_df[Cols.ENTRY_COUNT].sum()}")
-        st.write(f"Average Profit: \${filtered_df[Cols.PROFIT].mean():.2f}（{filtered_df[Cols.PROFIT].mean() * get_usd_jpy_rate():,.0f}円）")
-        st.write(f"Average Buy-in: \${filtered_df[Cols.BUY_IN].mean():.2f}（{filtered_df[Cols.BUY_IN].mean() * get_usd_jpy_rate():,.0f}円）")
-        st.write(f"In The Money (%): {itm_ratio:.2f}%")
-        st.write(f"Average ROI: {avg_roi:.2f}%")  # 修正された行
-        st.write(f"Total Profit: \${filtered_df[Cols.PROFIT].sum():.2f}（{filtered_df[Cols.PROFIT].sum() * get_usd_jpy_rate():,.0f}円）")
-        st.write(f"※exchange rate €1 = \${get_eur_usd_rate()}  1元 =  \${get_cny_usd_rate()} $1 = {get_usd_jpy_rate()}円")
+            # ローリング集計グラフ
+            col_41, col_42 = st.columns(2)
+            rolling_kind = col_41.selectbox('Rolling Window', [ROLLING_KIND_TOURNAMENTS, ROLLING_KIND_DAYS])
+            rolling_metric = col_42.selectbox('Rolling Metric', [ROLLING_METRIC_ROI, ROLLING_METRIC_ITM, ROLLING_METRIC_PROFIT])
+            rolling_columns = [rolling_column(rolling_metric, window) for window in rolling_window_labels(rolling_kind)]
 
-        # イン・ザ・マネー分配
-        show_in_the_money_distribution(filtered_df)
+            rolling_chart = alt.Chart(filtered_df[[x_axis_choice] + rolling_columns], width=600, height=300).transform_fold(
+                rolling_columns, as_=['Window', 'Value']
+            ).mark_line().encode(
+                x=alt.X(f'{x_axis_choice}:Q' if x_axis_choice == 'Record Index' else f'{x_axis_choice}:T', title=x_axis_choice),
+                y=alt.Y('Value:Q', title=f'Rolling {rolling_metric}'),
+                color=alt.Color('Window:N', title='Window'),
+                tooltip=[
+                    alt.Tooltip('Window:N', title='Window'),
+                    alt.Tooltip('Value:Q', title=rolling_metric, format='.2f')]
+            ).interactive()
 
-        # 曜日別
-        show_day_of_week(filtered_df, non_zero_buyin_df)
+            st.write(rolling_chart)
 
-        # 時間帯別
-        show_time_zone(filtered_df, non_zero_buyin_df)
+            # バイインが0でない場合のみでフィルタリング
+            non_zero_buyin_df = non_zero_buyin(filtered_df)
 
-        # Tournament History
-        history_df = show_tournament_history(filtered_df, HISTORY_DAY_MAX, HISTORY_DISPLAY_MAX)
+            # Additional stats below the graph
+            show_statistics(finalize_statistics(statistics_partials(filtered_df), itm_ratio))
 
-        # バイインの内訳
-        show_buy_in_breakdown(history_df)
+            # イン・ザ・マネー分配
+            show_in_the_money_distribution(in_the_money_counts(filtered_df))
 
-# 画面の下部にTwitterリンクを追加
-st.markdown(
-    """
-    ---
+            # 曜日別
+            show_day_of_week(group_partials(filtered_df, non_zero_buyin_df, Cols.DAY_OF_WEEK))
+
+            # 時間帯別
+            show_time_zone(group_partials(filtered_df, non_zero_buyin_df, Cols.TIME_ZONE))
+
+            # Tournament History
+            history_df = show_tournament_history(filtered_df, HISTORY_DAY_MAX, HISTORY_DISPLAY_MAX)
+            show_export(history_df, 'history')
+
+            # バイインの内訳
+            show_buy_in_breakdown(history_df)
+
+            # エクスポート
+            st.subheader('Export')
+            show_export(filtered_df, 'out')
+
+    # 画面の下部にTwitterリンクを追加
+    show_footer()
 
-    Follow me on X: [kacchimu](https://twitter.com/kacchimu)
-    """,
-    unsafe_allow_html=True,
-)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from test_hand_history import SAMPLE_HANDS
+
+# (トーナメントID, 名前, バイイン, 賞金, 何日前, 時刻, 参加人数, 順位, リエントリー回数)
+SAMPLE_TOURNAMENTS = [
+    ('103083445', 'Bounty Hunters $5.40', '$5.00+$0.40', 0.0, 3, '12:00:00', 1200, 400, 0),
+    ('103099999', 'Zodiac $10', '$9.20+$0.80', 52.3, 2, '20:00:00', 800, 30, 1),
+    ('200000001', 'Turbo Builder $1', '$0.90+$0.10', 5.85, 10, '21:00:00', 341, 33, 0),
+    ('200000002', 'Global MILLION $10', '$9.20+$0.80', 0.0, 10, '21:00:00', 3000, 1500, 2),
+    ('200000003', 'Daily Freeroll', '$0', 1.2, 10, '21:00:00', 500, 20, 0),
+    ('200000004', 'Hyper Bounty $25', '$23.00+$2.00', 180.0, 40, '03:00:00', 120, 2, 0),
+    ('200000005', 'WSOP Mega to $150', '$140.00+$10.00', 0.0, 41, '18:30:00', 90, 45, 1),
+    ('200000006', 'Zodiac $10', '$9.20+$0.80', 0.0, 90, '09:00:00', 700, 350, 0),
+    ('200000007', 'Turbo Builder $1', '$0.90+$0.10', 0.0, 120, '23:00:00', 300, 200, 0),
+    ('200000008', 'Global MILLION $10', '$9.20+$0.80', 75.0, 400, '14:00:00', 2500, 60, 0),
+    ('200000009', 'Bounty Hunters $54', '$50.00+$4.00', 0.0, 500, '14:00:00', 400, 300, 0),
+    ]
+
+
+def summary_text(tournament_id, name, buy_in, prize, days_ago, time, players, rank, reentries):
+    """
+    GGのトーナメントサマリー形式のテキストを作る
+    """
+    start_date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y/%m/%d')
+    lines = [
+        f"Tournament #{tournament_id}, {name}, Hold'em No Limit",
+        f'Buy-in: {buy_in}',
+        f'{players} Players',
+        f'Total Prize Pool: ${players * 1.0:,.2f}',
+        f'Tournament started {start_date} {time} ',
+        f'{rank}th : Hero, ${prize:,.2f}',
+        f'You made {reentries} re-entries' if reentries else f'You finished the tournament in {rank}th place.',
+        f'You received a total of ${prize:,.2f}.',
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def sample_directories(tmp_path):
+    """
+    サマリーとハンド履歴を書き出したフォルダの組 (サマリー, ハンド履歴) を返す
+    """
+    directory_path = tmp_path / 'tournaments'
+    hand_history_directory_path = tmp_path / 'hand_histories'
+    directory_path.mkdir()
+    hand_history_directory_path.mkdir()
+    for tournament in SAMPLE_TOURNAMENTS:
+        (directory_path / f'GG - Tournament #{tournament[0]}.txt').write_text(summary_text(*tournament), encoding='utf-8')
+    (hand_history_directory_path / 'hands.txt').write_text(SAMPLE_HANDS, encoding='utf-8')
+    return str(directory_path) + '/', str(hand_history_directory_path) + '/'
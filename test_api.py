@@ -0,0 +1,105 @@
+import json
+import os
+from datetime import date
+
+import pytest
+
+import api
+from api import ApiError, StatsApi
+from app import SnapshotHolder
+from conftest import SAMPLE_TOURNAMENTS, summary_text
+
+
+@pytest.fixture
+def stats_api(sample_directories):
+    return StatsApi(SnapshotHolder(*sample_directories))
+
+
+def history_ids(stats_api, query):
+    status, _, body = stats_api.handle('/history', query)
+    assert status == 200
+    return [item['Tournament ID'] for item in json.loads(body)['items']]
+
+
+def test_matching_if_none_match_returns_304(stats_api):
+    status, etag, body = stats_api.handle('/statistics', '')
+    assert status == 200 and body
+
+    status, not_modified_etag, body = stats_api.handle('/statistics', '', etag)
+    assert (status, not_modified_etag, body) == (304, etag, b'')
+
+    # クエリが異なれば別のETagになる
+    _, other_etag, _ = stats_api.handle('/statistics', 'buy_in_tags=Low')
+    assert other_etag != etag
+    assert stats_api.handle('/statistics', 'buy_in_tags=Low', etag)[0] == 200
+
+
+def test_new_version_changes_etag(stats_api, sample_directories):
+    _, etag, body = stats_api.handle('/statistics', '')
+    assert json.loads(body)['version'] == 1
+
+    directory_path = sample_directories[0]
+    tournament = ('300000001', 'Zodiac $10', '$9.20+$0.80', 30.0, 1, '10:00:00', 600, 40, 0)
+    with open(os.path.join(directory_path, 'GG - Tournament #300000001.txt'), 'w', encoding='utf-8') as f:
+        f.write(summary_text(*tournament))
+    # ファイル追加を確実に検知させるため、フォルダの更新時刻を進める
+    stat = os.stat(directory_path)
+    os.utime(directory_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    status, new_etag, body = stats_api.handle('/statistics', '', etag)
+    assert status == 200
+    assert new_etag != etag
+    payload = json.loads(body)
+    assert payload['version'] == 2
+    assert payload['statistics']['total_tournaments'] == len(SAMPLE_TOURNAMENTS) + 1
+
+
+def test_history_pages(stats_api):
+    total = len(SAMPLE_TOURNAMENTS)
+    per_page = 4
+    pages = [history_ids(stats_api, f'page={page}&per_page={per_page}') for page in range(1, 4)]
+
+    # 最後のページは端数のみ
+    assert [len(ids) for ids in pages] == [per_page, per_page, total - 2 * per_page]
+    all_ids = [tournament_id for ids in pages for tournament_id in ids]
+    assert sorted(all_ids) == sorted(tournament[0] for tournament in SAMPLE_TOURNAMENTS)
+
+    # 最後のページより後は空
+    status, _, body = stats_api.handle('/history', f'page=4&per_page={per_page}')
+    payload = json.loads(body)
+    assert status == 200
+    assert payload['items'] == []
+    assert payload['total'] == total
+
+
+@pytest.mark.parametrize('path, query', [
+    ('/history', 'page=0'),
+    ('/history', 'page=x'),
+    ('/history', 'per_page=0'),
+    ('/history', f'per_page={api.HISTORY_PER_PAGE_MAX + 1}'),
+    ('/statistics', 'since=2024-13-01'),
+    ('/statistics', 'since=yesterday'),
+    ])
+def test_bad_query_returns_400(stats_api, path, query):
+    with pytest.raises(ApiError) as excinfo:
+        stats_api.handle(path, query)
+    assert excinfo.value.status == 400
+
+
+def test_unknown_path_returns_404(stats_api):
+    with pytest.raises(ApiError) as excinfo:
+        stats_api.handle('/unknown', '')
+    assert excinfo.value.status == 404
+
+
+def test_buy_in_breakdown_follows_history_cut_off(stats_api, monkeypatch):
+    status, etag, body = stats_api.handle('/buy-in-breakdown', '')
+    assert status == 200
+    assert json.loads(body)['since'] == api.history_since().isoformat()
+
+    # 日付が変わると、ファイルが増えていなくても対象期間とETagが変わる
+    monkeypatch.setattr(api, 'history_since', lambda: date(2000, 1, 1))
+    status, new_etag, body = stats_api.handle('/buy-in-breakdown', '', etag)
+    assert status == 200
+    assert new_etag != etag
+    assert json.loads(body)['since'] == '2000-01-01'
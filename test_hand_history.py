@@ -0,0 +1,80 @@
+from app import Cols, aggregate_hand_histories, iter_hands, parse_hand
+
+# GGのハンド履歴エクスポートを簡略化したサンプル
+SAMPLE_HANDS = """Poker Hand #TM100000001: Tournament #103083445, Bounty Hunters $5.40 Hold'em No Limit - Level1(10/20(3)) - 2023/09/06 12:00:00
+Table '12' 8-max Seat #1 is the button
+Seat 1: Hero (1,000 in chips)
+Seat 2: 5f3a2b1c (1,000 in chips)
+Hero: posts the ante 3
+5f3a2b1c: posts the ante 3
+5f3a2b1c: posts small blind 10
+*** HOLE CARDS ***
+Dealt to Hero [Ah Kd]
+Dealt to 5f3a2b1c
+Hero: raises 40 to 60
+5f3a2b1c: calls 50
+*** FLOP *** [2c 3d 4h]
+5f3a2b1c: checks
+Hero: bets 937 and is all-in
+5f3a2b1c: folds
+*** SUMMARY ***
+Total pot 126 | Rake 0
+
+Poker Hand #TM100000002: Tournament #103083445, Bounty Hunters $5.40 Hold'em No Limit - Level1(10/20(3)) - 2023/09/06 12:01:00
+Table '12' 8-max Seat #2 is the button
+Seat 1: Hero (1,063 in chips)
+Seat 2: 5f3a2b1c (937 in chips)
+Hero: posts small blind 10
+*** HOLE CARDS ***
+Dealt to Hero [7h 2d]
+Dealt to 5f3a2b1c
+5f3a2b1c: raises 937 to 937 and is all-in
+Hero: folds
+*** SUMMARY ***
+Total pot 40 | Rake 0
+
+Poker Hand #TM100000003: Tournament #103099999, Zodiac $10 Hold'em No Limit - Level1(10/20(3)) - 2023/09/07 20:00:00
+Table '3' 8-max Seat #2 is the button
+Seat 1: Hero (1,000 in chips)
+Seat 2: 9d8e7f6a (1,000 in chips)
+*** HOLE CARDS ***
+Dealt to Hero [Qs Qd]
+Dealt to 9d8e7f6a
+9d8e7f6a: raises 40 to 60
+Hero: calls 40
+*** FLOP *** [Kc 8d 2s]
+Hero: checks
+9d8e7f6a: checks
+*** SUMMARY ***
+Total pot 120 | Rake 0
+"""
+
+
+def write_sample(tmp_path, encoding='utf-8'):
+    filepath = tmp_path / 'hands.txt'
+    filepath.write_text(SAMPLE_HANDS, encoding=encoding)
+    return str(filepath)
+
+
+def test_parse_hand_detects_vpip_and_all_in(tmp_path):
+    hands = [parse_hand(hand) for hand in iter_hands(write_sample(tmp_path))]
+    assert hands == [
+        ('103083445', True, True),
+        ('103083445', False, False),
+        ('103099999', True, False),
+    ]
+
+
+def test_iter_hands_keeps_first_hand_with_bom(tmp_path):
+    hands = list(iter_hands(write_sample(tmp_path, encoding='utf-8-sig')))
+    assert len(hands) == 3
+
+
+def test_aggregate_hand_histories_per_tournament(tmp_path):
+    hand_df = aggregate_hand_histories([write_sample(tmp_path)]).set_index(Cols.TOURNAMENT_ID)
+    assert hand_df.loc['103083445', Cols.HANDS] == 2
+    assert hand_df.loc['103083445', Cols.VPIP_HANDS] == 1
+    assert hand_df.loc['103083445', Cols.VPIP] == 50.0
+    assert hand_df.loc['103083445', Cols.ALL_IN_COUNT] == 1
+    assert hand_df.loc['103099999', Cols.HANDS] == 1
+    assert hand_df.loc['103099999', Cols.ALL_IN_COUNT] == 0
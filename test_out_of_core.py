@@ -0,0 +1,78 @@
+import dataclasses
+import math
+import os
+
+import pandas as pd
+import pytest
+
+from app import (
+    Cols,
+    DAY_OF_WEEK_ORDER,
+    Filters,
+    HISTORY_DAY_MAX,
+    SnapshotHolder,
+    analyze_store,
+    apply_filters,
+    build_store,
+    finalize_statistics,
+    group_partials,
+    group_table,
+    in_the_money_ratio,
+    non_zero_buyin,
+    recent_history,
+    statistics_partials,
+)
+from datetime import datetime, timedelta
+
+# 同時刻のトーナメントで件数の境界をまたぐよう、直近の成績は少ない件数で比べる
+DISPLAY_MAX = 4
+
+
+def all_rows(df):
+    return Filters(
+        since=df[Cols.START_TIME].min().date(),
+        until=df[Cols.START_TIME].max().date(),
+        buyin_range=(0, math.ceil(df[Cols.BUY_IN].max())),
+        players_range=(0, df[Cols.PLAYERS].max()))
+
+
+def some_rows(df):
+    return dataclasses.replace(
+        all_rows(df),
+        since=(datetime.now() - timedelta(days=100)).date(),
+        buyin_range=(0, 30),
+        tournament_tags=('Bounty', 'Builder', 'Zodiac', 'Freeroll'))
+
+
+@pytest.mark.parametrize('make_filters', [all_rows, some_rows])
+def test_out_of_core_matches_in_memory(sample_directories, tmp_path, make_filters):
+    directory_path, hand_history_directory_path = sample_directories
+    df = SnapshotHolder(directory_path, hand_history_directory_path).get().df
+    filters = make_filters(df)
+    itm_ratio = in_the_money_ratio(statistics_partials(df))
+
+    # パーティション分割とチャンクの境界を通るよう、小さいチャンクサイズでストアを作る
+    store_path = str(tmp_path / 'store' / 'tournaments.csv')
+    build_store(directory_path, hand_history_directory_path, store_path, chunk_size=3)
+    history_since = (datetime.now() - timedelta(days=HISTORY_DAY_MAX)).date()
+    result = analyze_store(store_path, os.path.getmtime(store_path), filters, history_since, DISPLAY_MAX,
+                           chunk_size=4)
+
+    filtered_df = apply_filters(df, filters)
+    non_zero_buyin_df = non_zero_buyin(filtered_df)
+
+    expected = dataclasses.asdict(finalize_statistics(statistics_partials(filtered_df), itm_ratio))
+    assert dataclasses.asdict(finalize_statistics(result['statistics'], itm_ratio)) == pytest.approx(expected)
+
+    pd.testing.assert_frame_equal(
+        group_table(result['day_of_week'], Cols.DAY_OF_WEEK, DAY_OF_WEEK_ORDER),
+        group_table(group_partials(filtered_df, non_zero_buyin_df, Cols.DAY_OF_WEEK), Cols.DAY_OF_WEEK, DAY_OF_WEEK_ORDER),
+        check_dtype=False)
+    pd.testing.assert_frame_equal(
+        group_table(result['time_zone'], Cols.TIME_ZONE).sort_index(),
+        group_table(group_partials(filtered_df, non_zero_buyin_df, Cols.TIME_ZONE), Cols.TIME_ZONE).sort_index(),
+        check_dtype=False)
+
+    history_ids = recent_history(result['history'], HISTORY_DAY_MAX, DISPLAY_MAX).index.to_list()
+    assert history_ids == recent_history(filtered_df, HISTORY_DAY_MAX, DISPLAY_MAX).index.to_list()
+    assert len(history_ids) == min(DISPLAY_MAX, len(filtered_df[filtered_df[Cols.START_TIME] >= pd.Timestamp(history_since)]))
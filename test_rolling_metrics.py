@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import (
+    Cols,
+    ROLLING_DAY_WINDOWS,
+    ROLLING_METRIC_ITM,
+    ROLLING_METRIC_PROFIT,
+    ROLLING_METRIC_ROI,
+    ROLLING_TOURNAMENT_WINDOWS,
+    add_rolling_metrics,
+    rolling_column,
+)
+
+
+def make_tournaments(n=700, seed=0):
+    """
+    Start Time順に並んだトーナメント成績(同時刻・リエントリーを含む)を作る
+    """
+    rng = np.random.default_rng(seed)
+    # 同時刻のトーナメントが並ぶよう、間隔に0時間を含める
+    hours = np.cumsum(rng.integers(0, 12, size=n))
+    buy_in = rng.choice([0.0, 1.0, 5.0, 20.0], size=n)
+    entry_count = rng.integers(1, 4, size=n)
+    prize = np.where(rng.random(n) < 0.2, rng.random(n) * 100, 0.0)
+    total_buy_in = buy_in * entry_count
+    return pd.DataFrame({
+        Cols.START_TIME: pd.Timestamp('2023-01-01') + pd.to_timedelta(hours, unit='h'),
+        Cols.TOTAL_BUY_IN: total_buy_in,
+        Cols.PRIZE: prize,
+        Cols.ENTRY_COUNT: entry_count,
+        Cols.PROFIT: prize - total_buy_in,
+    })
+
+
+def expected_metrics(rolling):
+    """
+    pandasのrolling集計から、ROI・ITM%・収支の期待値を求める
+    """
+    sums = rolling.sum()
+    roi = (sums[Cols.PROFIT] / sums[Cols.TOTAL_BUY_IN] * 100).where(sums[Cols.TOTAL_BUY_IN] > 0)
+    itm = sums['ITM'] / sums[Cols.ENTRY_COUNT] * 100
+    return roi.to_numpy(), itm.to_numpy(), sums[Cols.PROFIT].to_numpy()
+
+
+def rolling_input(df):
+    columns = df[[Cols.PROFIT, Cols.TOTAL_BUY_IN, Cols.ENTRY_COUNT]].astype(float)
+    columns['ITM'] = (df[Cols.PRIZE] > 0).astype(float)
+    return columns
+
+
+@pytest.mark.parametrize('window', ROLLING_TOURNAMENT_WINDOWS)
+def test_tournament_windows_match_pandas_rolling(window):
+    df = make_tournaments()
+    result = add_rolling_metrics(df)
+    roi, itm, profit = expected_metrics(rolling_input(df).rolling(window, min_periods=1))
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_ROI, str(window))], roi)
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_ITM, str(window))], itm)
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_PROFIT, str(window))], profit, atol=1e-9)
+
+
+@pytest.mark.parametrize('days', ROLLING_DAY_WINDOWS)
+def test_day_windows_match_pandas_rolling(days):
+    df = make_tournaments()
+    result = add_rolling_metrics(df)
+    columns = rolling_input(df).set_index(df[Cols.START_TIME])
+    roi, itm, profit = expected_metrics(columns.rolling(f'{days}D'))
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_ROI, f'{days}d')], roi)
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_ITM, f'{days}d')], itm)
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_PROFIT, f'{days}d')], profit, atol=1e-9)
+
+
+def test_fewer_rows_than_window_uses_all_rows():
+    df = make_tournaments(n=10)
+    result = add_rolling_metrics(df)
+    window = str(max(ROLLING_TOURNAMENT_WINDOWS))
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_PROFIT, window)], df[Cols.PROFIT].cumsum(), atol=1e-9)
+    itm = (df[Cols.PRIZE] > 0).cumsum() / df[Cols.ENTRY_COUNT].cumsum() * 100
+    np.testing.assert_allclose(result[rolling_column(ROLLING_METRIC_ITM, window)], itm)